@@ -0,0 +1,238 @@
+import numpy as np
+
+from aes_numpy import as_block_array, expand_key_array, encrypt_blocks_numpy
+
+# Bitsliced AES over Python big integers.
+# The state of N blocks is kept as 8 bit-planes (one per bit of a byte). Plane b is an integer of
+# 16 * N bits made of 16 segments of N bits: bit (i * N + j) is bit b of state byte i of block j.
+# SubBytes is evaluated as a Boolean circuit (GF(2^8) inversion by x^254 + affine map) on the planes,
+# ShiftRows / MixColumns become segment moves and XORs, so every block goes through the exact same
+# sequence of operations and the interpreter overhead is shared by all N blocks.
+
+
+# Function to build the masks for a batch of N blocks: one segment, the whole plane,
+# and a helper giving the segments of one row for a range of columns
+def segment_masks(n):
+    segment = (1 << n) - 1
+    full = (1 << (16 * n)) - 1
+
+    def columns_of_row(row, first, last):
+        mask = 0
+        for column in range(first, last):
+            mask |= segment << ((4 * column + row) * n)
+        return mask
+
+    return segment, full, columns_of_row
+
+
+# Helper object holding the masks and the permutations for one batch size
+class BitslicedLayout:
+
+    def __init__(self, n):
+        self.n = n
+        segment, self.full, columns_of_row = segment_masks(n)
+        # Row rotation inside each column (row r takes row r + k of the same column), used by MixColumns
+        self.rows_low = [columns_of_row(0, 0, 4) | columns_of_row(1, 0, 4) | columns_of_row(2, 0, 4),
+                         columns_of_row(0, 0, 4) | columns_of_row(1, 0, 4),
+                         columns_of_row(0, 0, 4)]
+        self.rows_high = [columns_of_row(3, 0, 4),
+                          columns_of_row(2, 0, 4) | columns_of_row(3, 0, 4),
+                          columns_of_row(1, 0, 4) | columns_of_row(2, 0, 4) | columns_of_row(3, 0, 4)]
+        # ShiftRows: row r of column c takes column (c + r) % 4; split into the part that moves down
+        # (columns 0 .. 3 - r) and the part that wraps around (columns 4 - r .. 3)
+        self.shift_stay = [columns_of_row(r, 0, 4 - r) for r in range(4)]
+        self.shift_wrap = [columns_of_row(r, 4 - r, 4) for r in range(4)]
+        # Inverse ShiftRows: row r of column c takes column (c - r) % 4
+        self.inv_shift_stay = [columns_of_row(r, r, 4) for r in range(4)]
+        self.inv_shift_wrap = [columns_of_row(r, 0, r) for r in range(4)]
+
+    # Rotate the rows of every column by k (row r <- row (r + k) % 4) on one plane
+    def rotate_rows(self, plane, k):
+        n = self.n
+        return ((plane >> (k * n)) & self.rows_low[k - 1]) | ((plane << ((4 - k) * n)) & self.rows_high[k - 1])
+
+    # ShiftRows on one plane
+    def shift_rows(self, plane):
+        n = self.n
+        out = plane & self.shift_stay[0]
+        for r in range(1, 4):
+            out |= (plane >> (4 * r * n)) & self.shift_stay[r]
+            out |= (plane << ((16 - 4 * r) * n)) & self.shift_wrap[r]
+        return out
+
+    # Inverse ShiftRows on one plane
+    def inverse_shift_rows(self, plane):
+        n = self.n
+        out = plane & self.inv_shift_stay[0]
+        for r in range(1, 4):
+            out |= (plane << (4 * r * n)) & self.inv_shift_stay[r]
+            out |= (plane >> ((16 - 4 * r) * n)) & self.inv_shift_wrap[r]
+        return out
+
+
+# Function to reduce a 15-plane polynomial product modulo x^8 + x^4 + x^3 + x + 1
+def reduce_planes(p):
+    for k in range(14, 7, -1):
+        p[k - 8] ^= p[k]
+        p[k - 7] ^= p[k]
+        p[k - 5] ^= p[k]
+        p[k - 4] ^= p[k]
+    return p[:8]
+
+
+# Function to multiply two bitsliced GF(2^8) elements (64 AND gates + XOR reduction)
+def gf_multiply_planes(a, b):
+    p = [0] * 15
+    for i in range(8):
+        ai = a[i]
+        for j in range(8):
+            p[i + j] ^= ai & b[j]
+    return reduce_planes(p)
+
+
+# Function to square a bitsliced GF(2^8) element (squaring is linear: bit i moves to bit 2i)
+def gf_square_planes(a):
+    p = [0] * 15
+    for i in range(8):
+        p[2 * i] = a[i]
+    return reduce_planes(p)
+
+
+# Function to compute x^254 = x^-1 (and 0 -> 0) with 4 multiplications and 7 squarings
+def gf_inverse_planes(x):
+    x2 = gf_square_planes(x)
+    x3 = gf_multiply_planes(x2, x)
+    x12 = gf_square_planes(gf_square_planes(x3))
+    x15 = gf_multiply_planes(x12, x3)
+    x240 = x15
+    for _ in range(4):
+        x240 = gf_square_planes(x240)
+    return gf_multiply_planes(gf_multiply_planes(x240, x12), x2)
+
+
+# SubBytes as a Boolean circuit: inversion followed by the affine map with constant 0x63
+def sub_bytes_planes(x, full):
+    inv = gf_inverse_planes(x)
+    out = []
+    for i in range(8):
+        bit = inv[i] ^ inv[(i + 4) % 8] ^ inv[(i + 5) % 8] ^ inv[(i + 6) % 8] ^ inv[(i + 7) % 8]
+        if (0x63 >> i) & 1:
+            bit ^= full
+        out.append(bit)
+    return out
+
+
+# InvSubBytes: inverse affine map with constant 0x05, followed by the inversion
+def inverse_sub_bytes_planes(x, full):
+    pre = []
+    for i in range(8):
+        bit = x[(i + 2) % 8] ^ x[(i + 5) % 8] ^ x[(i + 7) % 8]
+        if (0x05 >> i) & 1:
+            bit ^= full
+        pre.append(bit)
+    return gf_inverse_planes(pre)
+
+
+# xtime on planes: a shift of the planes plus XORs of the top plane into bits 0, 1, 3 and 4
+def xtime_planes(a):
+    top = a[7]
+    return [top, a[0] ^ top, a[1], a[2] ^ top, a[3] ^ top, a[4], a[5], a[6]]
+
+
+# MixColumns on planes: new a_r = a_r ^ t ^ xtime(a_r ^ a_(r+1)) with t the XOR of the column,
+# where a_r ^ t is simply the XOR of the three other rows of the column
+def mix_columns_planes(x, layout):
+    rot1 = [layout.rotate_rows(p, 1) for p in x]
+    rot2 = [layout.rotate_rows(p, 2) for p in x]
+    rot3 = [layout.rotate_rows(p, 3) for p in x]
+    doubled = xtime_planes([x[b] ^ rot1[b] for b in range(8)])
+    return [rot1[b] ^ rot2[b] ^ rot3[b] ^ doubled[b] for b in range(8)]
+
+
+# InvMixColumns: same preprocessing trick as inverse_mix_columns, then MixColumns
+def inverse_mix_columns_planes(x, layout):
+    rot2 = [layout.rotate_rows(p, 2) for p in x]
+    quadrupled = xtime_planes(xtime_planes([x[b] ^ rot2[b] for b in range(8)]))
+    return mix_columns_planes([x[b] ^ quadrupled[b] for b in range(8)], layout)
+
+
+# Function to transpose an (N, 16) block array into 8 bit-planes
+def blocks_to_planes(blocks):
+    by_position = np.ascontiguousarray(blocks.T)  # shape (16, N): segment i holds byte i of every block
+    planes = []
+    for b in range(8):
+        bits = ((by_position >> b) & 1).reshape(-1)
+        planes.append(int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little"))
+    return planes
+
+
+# Function to transpose 8 bit-planes back into an (N, 16) block array
+def planes_to_blocks(planes, n):
+    size = (16 * n + 7) // 8
+    out = np.zeros(16 * n, dtype=np.uint8)
+    for b, plane in enumerate(planes):
+        raw = np.frombuffer(plane.to_bytes(size, "little"), dtype=np.uint8)
+        out |= np.unpackbits(raw, bitorder="little")[:16 * n] << b
+    return out.reshape(16, n).T.copy()
+
+
+# Function to broadcast the round keys into planes (each key bit becomes an all-ones / all-zeros segment)
+def round_key_planes(round_keys, n):
+    segment = (1 << n) - 1
+    planes = []
+    for round_key in round_keys:
+        key_planes = [0] * 8
+        for i, byte in enumerate(round_key):
+            for b in range(8):
+                if (int(byte) >> b) & 1:
+                    key_planes[b] |= segment << (i * n)
+        planes.append(key_planes)
+    return planes
+
+
+# Function for bitsliced encryption: (N, 16) uint8 plaintexts -> (N, 16) uint8 ciphertexts
+def bitsliced_encrypt_blocks(blocks, key, rounds):
+    blocks = as_block_array(blocks)
+    n = len(blocks)
+    if n == 0:
+        return blocks.copy()
+    layout = BitslicedLayout(n)
+    keys = round_key_planes(expand_key_array(key, rounds), n)
+
+    state = [p ^ k for p, k in zip(blocks_to_planes(blocks), keys[0])]
+    for round in range(1, rounds):
+        state = sub_bytes_planes(state, layout.full)
+        state = [layout.shift_rows(p) for p in state]
+        state = mix_columns_planes(state, layout)
+        state = [p ^ k for p, k in zip(state, keys[round])]
+    state = sub_bytes_planes(state, layout.full)
+    state = [layout.shift_rows(p) ^ k for p, k in zip(state, keys[rounds])]
+    return planes_to_blocks(state, n)
+
+
+# Function for bitsliced decryption: (N, 16) uint8 ciphertexts -> (N, 16) uint8 plaintexts
+def bitsliced_decrypt_blocks(blocks, key, rounds):
+    blocks = as_block_array(blocks)
+    n = len(blocks)
+    if n == 0:
+        return blocks.copy()
+    layout = BitslicedLayout(n)
+    keys = round_key_planes(expand_key_array(key, rounds), n)
+
+    state = [layout.inverse_shift_rows(p ^ k) for p, k in zip(blocks_to_planes(blocks), keys[rounds])]
+    state = inverse_sub_bytes_planes(state, layout.full)
+    for round in range(rounds - 1, 0, -1):
+        state = [p ^ k for p, k in zip(state, keys[round])]
+        state = inverse_mix_columns_planes(state, layout)
+        state = [layout.inverse_shift_rows(p) for p in state]
+        state = inverse_sub_bytes_planes(state, layout.full)
+    state = [p ^ k for p, k in zip(state, keys[0])]
+    return planes_to_blocks(state, n)
+
+
+# Function to cross-validate the bitsliced engine against the table-based NumPy engine on random blocks
+def cross_validate(key, rounds, count=4096, seed=0):
+    blocks = np.random.default_rng(seed).integers(0, 256, size=(count, 16), dtype=np.uint8)
+    ciphertexts = bitsliced_encrypt_blocks(blocks, key, rounds)
+    return bool(np.array_equal(ciphertexts, encrypt_blocks_numpy(blocks, key, rounds))
+                and np.array_equal(bitsliced_decrypt_blocks(ciphertexts, key, rounds), blocks))
@@ -0,0 +1,184 @@
+from functools import lru_cache
+
+from tables import s_box, inv_s_box
+from aes_implementation import expand_key, multiply_by_two
+
+
+# Function to multiply a byte by an arbitrary constant in GF(2^8) (used to build the T-tables)
+def gf_multiply(a, b):
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        a = multiply_by_two(a)
+        b >>= 1
+    return result
+
+
+# Function to rotate a 32-bit word right by a number of bytes
+def rotate_word_right(word, count):
+    shift = 8 * count
+    return ((word >> shift) | (word << (32 - shift))) & 0xFFFFFFFF
+
+
+# Function to pack four bytes (MSB first) into a single 32-bit word
+def pack_word(b0, b1, b2, b3):
+    return (b0 << 24) | (b1 << 16) | (b2 << 8) | b3
+
+
+# Function to build the four encryption T-tables (SubBytes + MixColumns for each row position)
+def build_encryption_tables():
+    te0 = []
+    for x in range(256):
+        s = s_box[x]
+        te0.append(pack_word(gf_multiply(s, 2), s, s, gf_multiply(s, 3)))
+    te1 = [rotate_word_right(w, 1) for w in te0]
+    te2 = [rotate_word_right(w, 2) for w in te0]
+    te3 = [rotate_word_right(w, 3) for w in te0]
+    return tuple(te0), tuple(te1), tuple(te2), tuple(te3)
+
+
+# Function to build the four decryption T-tables (InvSubBytes + InvMixColumns for each row position)
+def build_decryption_tables():
+    td0 = []
+    for x in range(256):
+        s = inv_s_box[x]
+        td0.append(pack_word(gf_multiply(s, 14), gf_multiply(s, 9), gf_multiply(s, 13), gf_multiply(s, 11)))
+    td1 = [rotate_word_right(w, 1) for w in td0]
+    td2 = [rotate_word_right(w, 2) for w in td0]
+    td3 = [rotate_word_right(w, 3) for w in td0]
+    return tuple(td0), tuple(td1), tuple(td2), tuple(td3)
+
+
+# The T-tables are built only once, when the module is imported
+Te0, Te1, Te2, Te3 = build_encryption_tables()
+Td0, Td1, Td2, Td3 = build_decryption_tables()
+
+
+# Function to convert the expanded key (list of 4-byte words) into 32-bit round key words
+def expand_key_words(key, rounds):
+    return [pack_word(*word) for word in expand_key(key, rounds)]
+
+
+# Function to apply InvMixColumns to a single round key word (needed by the equivalent inverse cipher)
+def inverse_mix_word(word):
+    return (Td0[s_box[word >> 24]] ^ Td1[s_box[(word >> 16) & 0xFF]]
+            ^ Td2[s_box[(word >> 8) & 0xFF]] ^ Td3[s_box[word & 0xFF]])
+
+
+# Function to derive the decryption round keys from the encryption round keys
+# Round keys are reversed and, except for the first and last round, passed through InvMixColumns
+def decryption_key_words(enc_words, rounds):
+    dec_words = list(enc_words[rounds * 4:(rounds + 1) * 4])
+    for round in range(rounds - 1, 0, -1):
+        dec_words.extend(inverse_mix_word(w) for w in enc_words[round * 4:(round + 1) * 4])
+    dec_words.extend(enc_words[0:4])
+    return dec_words
+
+
+# Function to encrypt one 16-byte block with already expanded round key words
+def encrypt_block_words(block, rk, rounds):
+    s0 = int.from_bytes(block[0:4], "big") ^ rk[0]
+    s1 = int.from_bytes(block[4:8], "big") ^ rk[1]
+    s2 = int.from_bytes(block[8:12], "big") ^ rk[2]
+    s3 = int.from_bytes(block[12:16], "big") ^ rk[3]
+
+    k = 4
+    for _ in range(1, rounds):
+        t0 = Te0[s0 >> 24] ^ Te1[(s1 >> 16) & 0xFF] ^ Te2[(s2 >> 8) & 0xFF] ^ Te3[s3 & 0xFF] ^ rk[k]
+        t1 = Te0[s1 >> 24] ^ Te1[(s2 >> 16) & 0xFF] ^ Te2[(s3 >> 8) & 0xFF] ^ Te3[s0 & 0xFF] ^ rk[k + 1]
+        t2 = Te0[s2 >> 24] ^ Te1[(s3 >> 16) & 0xFF] ^ Te2[(s0 >> 8) & 0xFF] ^ Te3[s1 & 0xFF] ^ rk[k + 2]
+        t3 = Te0[s3 >> 24] ^ Te1[(s0 >> 16) & 0xFF] ^ Te2[(s1 >> 8) & 0xFF] ^ Te3[s2 & 0xFF] ^ rk[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+
+    # Last round: SubBytes and ShiftRows only (no MixColumns)
+    k = rounds * 4
+    out = (
+        (pack_word(s_box[s0 >> 24], s_box[(s1 >> 16) & 0xFF], s_box[(s2 >> 8) & 0xFF], s_box[s3 & 0xFF]) ^ rk[k]),
+        (pack_word(s_box[s1 >> 24], s_box[(s2 >> 16) & 0xFF], s_box[(s3 >> 8) & 0xFF], s_box[s0 & 0xFF]) ^ rk[k + 1]),
+        (pack_word(s_box[s2 >> 24], s_box[(s3 >> 16) & 0xFF], s_box[(s0 >> 8) & 0xFF], s_box[s1 & 0xFF]) ^ rk[k + 2]),
+        (pack_word(s_box[s3 >> 24], s_box[(s0 >> 16) & 0xFF], s_box[(s1 >> 8) & 0xFF], s_box[s2 & 0xFF]) ^ rk[k + 3]),
+    )
+    return b"".join(w.to_bytes(4, "big") for w in out)
+
+
+# Function to decrypt one 16-byte block with decryption round key words (see decryption_key_words)
+def decrypt_block_words(block, dk, rounds):
+    s0 = int.from_bytes(block[0:4], "big") ^ dk[0]
+    s1 = int.from_bytes(block[4:8], "big") ^ dk[1]
+    s2 = int.from_bytes(block[8:12], "big") ^ dk[2]
+    s3 = int.from_bytes(block[12:16], "big") ^ dk[3]
+
+    k = 4
+    for _ in range(1, rounds):
+        t0 = Td0[s0 >> 24] ^ Td1[(s3 >> 16) & 0xFF] ^ Td2[(s2 >> 8) & 0xFF] ^ Td3[s1 & 0xFF] ^ dk[k]
+        t1 = Td0[s1 >> 24] ^ Td1[(s0 >> 16) & 0xFF] ^ Td2[(s3 >> 8) & 0xFF] ^ Td3[s2 & 0xFF] ^ dk[k + 1]
+        t2 = Td0[s2 >> 24] ^ Td1[(s1 >> 16) & 0xFF] ^ Td2[(s0 >> 8) & 0xFF] ^ Td3[s3 & 0xFF] ^ dk[k + 2]
+        t3 = Td0[s3 >> 24] ^ Td1[(s2 >> 16) & 0xFF] ^ Td2[(s1 >> 8) & 0xFF] ^ Td3[s0 & 0xFF] ^ dk[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+        k += 4
+
+    # Last round: InvShiftRows and InvSubBytes only (no InvMixColumns)
+    k = rounds * 4
+    out = (
+        (pack_word(inv_s_box[s0 >> 24], inv_s_box[(s3 >> 16) & 0xFF], inv_s_box[(s2 >> 8) & 0xFF], inv_s_box[s1 & 0xFF]) ^ dk[k]),
+        (pack_word(inv_s_box[s1 >> 24], inv_s_box[(s0 >> 16) & 0xFF], inv_s_box[(s3 >> 8) & 0xFF], inv_s_box[s2 & 0xFF]) ^ dk[k + 1]),
+        (pack_word(inv_s_box[s2 >> 24], inv_s_box[(s1 >> 16) & 0xFF], inv_s_box[(s0 >> 8) & 0xFF], inv_s_box[s3 & 0xFF]) ^ dk[k + 2]),
+        (pack_word(inv_s_box[s3 >> 24], inv_s_box[(s2 >> 16) & 0xFF], inv_s_box[(s1 >> 8) & 0xFF], inv_s_box[s0 & 0xFF]) ^ dk[k + 3]),
+    )
+    return b"".join(w.to_bytes(4, "big") for w in out)
+
+
+# Function for encryption using the T-table engine (same result as perform_encryption, but returns bytes)
+def ttable_encryption(plaintext, key, rounds):
+    return encrypt_block_words(plaintext, expand_key_words(key, rounds), rounds)
+
+
+# Function for decryption using the T-table engine (takes and returns bytes)
+def ttable_decryption(ciphertext, key, rounds):
+    enc_words = expand_key_words(key, rounds)
+    return decrypt_block_words(ciphertext, decryption_key_words(enc_words, rounds), rounds)
+
+
+# Number of (key, rounds) schedules kept in memory; workloads cycle through a small set of keys
+KEY_SCHEDULE_CACHE_SIZE = 128
+
+
+# Function to expand both the encryption and decryption round keys once per (key, rounds) pair
+# Results are kept in a bounded LRU cache so repeated keys skip the key expansion entirely
+@lru_cache(maxsize=KEY_SCHEDULE_CACHE_SIZE)
+def cached_key_schedule(key, rounds):
+    enc_words = expand_key_words(key, rounds)
+    return tuple(enc_words), tuple(decryption_key_words(enc_words, rounds))
+
+
+# Reusable cipher object: the key schedule is expanded once and shared by every block
+class AES:
+
+    def __init__(self, key, rounds):
+        self.key = bytes(key)
+        self.rounds = rounds
+        self.enc_words, self.dec_words = cached_key_schedule(self.key, rounds)
+
+    # Encrypt a single 16-byte block
+    def encrypt_block(self, block):
+        return encrypt_block_words(block, self.enc_words, self.rounds)
+
+    # Decrypt a single 16-byte block
+    def decrypt_block(self, block):
+        return decrypt_block_words(block, self.dec_words, self.rounds)
+
+    # Encrypt a byte string made of whole 16-byte blocks, block by block (ECB)
+    def encrypt_blocks(self, data):
+        if len(data) % 16 != 0:
+            raise ValueError("Data length must be a multiple of 16 bytes.")
+        enc_words, rounds = self.enc_words, self.rounds
+        return b"".join(encrypt_block_words(data[i:i + 16], enc_words, rounds) for i in range(0, len(data), 16))
+
+    # Decrypt a byte string made of whole 16-byte blocks, block by block (ECB)
+    def decrypt_blocks(self, data):
+        if len(data) % 16 != 0:
+            raise ValueError("Data length must be a multiple of 16 bytes.")
+        dec_words, rounds = self.dec_words, self.rounds
+        return b"".join(decrypt_block_words(data[i:i + 16], dec_words, rounds) for i in range(0, len(data), 16))
@@ -231,18 +231,21 @@ def execute_aes(pt, k, rounds):
     blocks = [pt[i:i + 32] for i in range(0, len(pt), 32)]
     ciphertext_blocks = [] # store the ciphertext in this
 
+    # Expand the key schedule once and reuse it for every block (imported here to avoid a circular import)
+    from aes_fast import AES
+    cipher = AES(key, rounds)
+
     # Function to encrpyion each blcok of plaintext
     for block_index, block in enumerate(blocks):
         plaintext = bytes.fromhex(block)
         print(f"Processing Block {block_index + 1}:")
         print("Plaintext (Hex):", block)
 
-        ciphertext = perform_encryption(plaintext, key, rounds)
-        ciphertext_bytes = convert_matrix_to_bytes(ciphertext)
+        ciphertext_bytes = cipher.encrypt_block(plaintext)
 
         print("Ciphertext in Hex (4x4 Matrix):")
         print(format_bytes_as_matrix(ciphertext_bytes))
-        ciphertext_blocks.append(ciphertext)
+        ciphertext_blocks.append(ciphertext_bytes)
         print("\n")
 
     print("\n-----------------------------------------------------\n")
@@ -254,10 +257,9 @@ def execute_aes(pt, k, rounds):
     for block_index, ciphertext in enumerate(ciphertext_blocks):
         
         print(f"Processing Block {block_index + 1}:")
-        print("Ciphertext (Hex):", block)
+        print("Ciphertext (Hex):", ciphertext.hex())
 
-        plaintext = perform_decryption(ciphertext, key, rounds)
-        plaintext_bytes = convert_matrix_to_bytes(plaintext)
+        plaintext_bytes = cipher.decrypt_block(ciphertext)
 
         print("Decrypted Plaintext (Hex):")
         print(format_bytes_as_matrix(plaintext_bytes))
@@ -0,0 +1,156 @@
+from tables import s_box, inv_s_box, xtime
+from aes_implementation import expand_key
+
+# The state is a single bytearray(16) (or a writable memoryview of 16 bytes) in column-major order:
+# byte 4 * c + r is row r of column c, i.e. exactly the order of the plaintext / ciphertext bytes.
+# Every round operation below mutates that buffer in place, so no new state lists are created per round.
+
+
+# Function to expand the key once into a flat bytes object of (rounds + 1) * 16 round key bytes
+def expand_key_bytes(key, rounds):
+    words = expand_key(key, rounds)[:4 * (rounds + 1)]
+    return bytes(byte for word in words for byte in word)
+
+
+# Function to XOR the round key starting at `offset` into the state
+def add_round_key_in_place(state, round_keys, offset):
+    for i in range(16):
+        state[i] ^= round_keys[offset + i]
+
+
+# Function to substitute every byte of the state through the S-box
+def sub_bytes_in_place(state):
+    for i in range(16):
+        state[i] = s_box[state[i]]
+
+
+# Function to substitute every byte of the state through the inverse S-box
+def inverse_sub_bytes_in_place(state):
+    for i in range(16):
+        state[i] = inv_s_box[state[i]]
+
+
+# Function to shift rows left: row r of column c takes row r of column (c + r) % 4
+def shift_rows_in_place(state):
+    # Row 1: rotate by one column
+    t = state[1]
+    state[1] = state[5]
+    state[5] = state[9]
+    state[9] = state[13]
+    state[13] = t
+    # Row 2: swap columns two apart
+    t = state[2]
+    state[2] = state[10]
+    state[10] = t
+    t = state[6]
+    state[6] = state[14]
+    state[14] = t
+    # Row 3: rotate by three columns (one to the right)
+    t = state[15]
+    state[15] = state[11]
+    state[11] = state[7]
+    state[7] = state[3]
+    state[3] = t
+
+
+# Function to shift rows right (inverse of shift_rows_in_place)
+def inverse_shift_rows_in_place(state):
+    t = state[13]
+    state[13] = state[9]
+    state[9] = state[5]
+    state[5] = state[1]
+    state[1] = t
+    t = state[2]
+    state[2] = state[10]
+    state[10] = t
+    t = state[6]
+    state[6] = state[14]
+    state[14] = t
+    t = state[3]
+    state[3] = state[7]
+    state[7] = state[11]
+    state[11] = state[15]
+    state[15] = t
+
+
+# Function to apply MixColumns to each column of the state
+def mix_columns_in_place(state):
+    for c in (0, 4, 8, 12):
+        a0 = state[c]
+        a1 = state[c + 1]
+        a2 = state[c + 2]
+        a3 = state[c + 3]
+        t = a0 ^ a1 ^ a2 ^ a3
+        state[c] = a0 ^ t ^ xtime[a0 ^ a1]
+        state[c + 1] = a1 ^ t ^ xtime[a1 ^ a2]
+        state[c + 2] = a2 ^ t ^ xtime[a2 ^ a3]
+        state[c + 3] = a3 ^ t ^ xtime[a3 ^ a0]
+
+
+# Function to apply InvMixColumns (same preprocessing as inverse_mix_columns, then MixColumns)
+def inverse_mix_columns_in_place(state):
+    for c in (0, 4, 8, 12):
+        u = xtime[xtime[state[c] ^ state[c + 2]]]
+        v = xtime[xtime[state[c + 1] ^ state[c + 3]]]
+        state[c] ^= u
+        state[c + 1] ^= v
+        state[c + 2] ^= u
+        state[c + 3] ^= v
+    mix_columns_in_place(state)
+
+
+# Function to encrypt the 16-byte state in place with a flat round key buffer
+def encrypt_in_place(state, round_keys, rounds):
+    add_round_key_in_place(state, round_keys, 0)
+    for round in range(1, rounds):
+        sub_bytes_in_place(state)
+        shift_rows_in_place(state)
+        mix_columns_in_place(state)
+        add_round_key_in_place(state, round_keys, 16 * round)
+    sub_bytes_in_place(state)
+    shift_rows_in_place(state)
+    add_round_key_in_place(state, round_keys, 16 * rounds)
+
+
+# Function to decrypt the 16-byte state in place with a flat round key buffer
+def decrypt_in_place(state, round_keys, rounds):
+    add_round_key_in_place(state, round_keys, 16 * rounds)
+    inverse_shift_rows_in_place(state)
+    inverse_sub_bytes_in_place(state)
+    for round in range(rounds - 1, 0, -1):
+        add_round_key_in_place(state, round_keys, 16 * round)
+        inverse_mix_columns_in_place(state)
+        inverse_shift_rows_in_place(state)
+        inverse_sub_bytes_in_place(state)
+    add_round_key_in_place(state, round_keys, 0)
+
+
+# Cipher object for the small-message path: the round keys are expanded once,
+# and blocks are encrypted directly inside a caller-provided buffer
+class InPlaceAES:
+
+    def __init__(self, key, rounds):
+        self.rounds = rounds
+        self.round_keys = expand_key_bytes(key, rounds)
+
+    # Encrypt / decrypt one 16-byte writable buffer (bytearray or memoryview) in place
+    def encrypt_into(self, state):
+        encrypt_in_place(state, self.round_keys, self.rounds)
+
+    def decrypt_into(self, state):
+        decrypt_in_place(state, self.round_keys, self.rounds)
+
+    # Encrypt / decrypt every 16-byte block of a writable buffer in place (ECB)
+    def encrypt_buffer(self, buffer):
+        view = memoryview(buffer)
+        if len(view) % 16 != 0:
+            raise ValueError("Buffer length must be a multiple of 16 bytes.")
+        for i in range(0, len(view), 16):
+            encrypt_in_place(view[i:i + 16], self.round_keys, self.rounds)
+
+    def decrypt_buffer(self, buffer):
+        view = memoryview(buffer)
+        if len(view) % 16 != 0:
+            raise ValueError("Buffer length must be a multiple of 16 bytes.")
+        for i in range(0, len(view), 16):
+            decrypt_in_place(view[i:i + 16], self.round_keys, self.rounds)
@@ -0,0 +1,263 @@
+import functools
+import os
+
+import numpy as np
+
+from aes_fast import AES
+from aes_numpy import expand_key_array, encrypt_blocks_with_round_keys, decrypt_blocks_with_round_keys
+
+BLOCK_SIZE = 16
+
+# Amount of input processed per step; memory use stays bounded by a few chunks whatever the message size
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+MODES = ("ecb", "cbc", "ctr")
+
+
+# Function to read raw chunks from a path, a file object, a bytes-like object or an iterator of bytes
+def read_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as handle:
+            yield from read_chunks(handle, chunk_size)
+    elif hasattr(source, "read"):
+        while True:
+            data = source.read(chunk_size)
+            if not data:
+                break
+            yield data
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for i in range(0, len(view), chunk_size):
+            yield view[i:i + chunk_size]
+    else:
+        for data in source:
+            if data:
+                yield data
+
+
+# Function to regroup the input into block-aligned chunks
+# Yields (chunk, is_last); every chunk but the last is a multiple of 16 bytes.
+# With hold_back=True the last chunk always keeps the final full block (needed to strip padding).
+def aligned_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE, hold_back=False):
+    chunk_size = max(BLOCK_SIZE, chunk_size - chunk_size % BLOCK_SIZE)
+    reserve = BLOCK_SIZE if hold_back else 0
+    buffer = bytearray()
+    for data in read_chunks(source, chunk_size):
+        buffer += data
+        while len(buffer) >= chunk_size + reserve + 1:
+            yield bytes(buffer[:chunk_size]), False
+            del buffer[:chunk_size]
+    yield bytes(buffer), True
+
+
+# Function to add PKCS#7 padding to the last chunk (ECB and CBC only)
+def pad(data):
+    count = BLOCK_SIZE - len(data) % BLOCK_SIZE
+    return data + bytes([count]) * count
+
+
+# Function to remove and check PKCS#7 padding
+def unpad(data):
+    if not data or len(data) % BLOCK_SIZE != 0:
+        raise ValueError("Ciphertext length must be a non-zero multiple of 16 bytes.")
+    count = data[-1]
+    if count < 1 or count > BLOCK_SIZE or data[-count:] != bytes([count]) * count:
+        raise ValueError("Invalid padding.")
+    return data[:-count]
+
+
+# Function to turn a byte string into an (N, 16) block array
+def to_blocks(data):
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, BLOCK_SIZE)
+
+
+# Function to build a batch of consecutive 128-bit big-endian counter blocks starting at `counter`
+def counter_blocks(counter, count):
+    high, low = counter >> 64, counter & 0xFFFFFFFFFFFFFFFF
+    low_words = np.arange(count, dtype=np.uint64) + np.uint64(low)
+    carry = (low_words < np.uint64(low)).astype(np.uint64)
+    high_words = np.uint64(high) + carry
+    blocks = np.empty((count, 2), dtype=">u8")
+    blocks[:, 0] = high_words
+    blocks[:, 1] = low_words
+    return blocks.view(np.uint8).reshape(count, BLOCK_SIZE)
+
+
+# Function to check the IV / initial counter block of CBC and CTR
+def check_iv(iv, mode):
+    if mode == "ecb":
+        return None
+    if iv is None or len(iv) != BLOCK_SIZE:
+        raise ValueError(f"{mode.upper()} mode needs a 16-byte IV / initial counter block.")
+    return bytes(iv)
+
+
+# Serial block engine: runs every chunk on the NumPy batch path in this process
+# (aes_parallel.ParallelBlockEngine offers the same methods backed by a process pool)
+class BlockEngine:
+
+    def __init__(self, round_keys, rounds):
+        self.round_keys = round_keys
+        self.rounds = rounds
+
+    # ECB-encrypt a block-aligned byte string
+    def encrypt(self, data):
+        return encrypt_blocks_with_round_keys(to_blocks(data), self.round_keys, self.rounds).tobytes()
+
+    # ECB-decrypt a block-aligned byte string
+    def decrypt(self, data):
+        return decrypt_blocks_with_round_keys(to_blocks(data), self.round_keys, self.rounds).tobytes()
+
+    # XOR data with the CTR keystream starting at the given counter value
+    def keystream_xor(self, data, counter):
+        return ctr_xor(data, counter, self.round_keys, self.rounds).tobytes()
+
+    def close(self):
+        pass
+
+
+# Function to XOR a byte string with one vectorized batch of CTR keystream, returns a uint8 array
+def ctr_xor(data, counter, round_keys, rounds):
+    count = (len(data) + BLOCK_SIZE - 1) // BLOCK_SIZE
+    keystream = encrypt_blocks_with_round_keys(counter_blocks(counter, count), round_keys, rounds)
+    return np.frombuffer(data, dtype=np.uint8) ^ keystream.reshape(-1)[:len(data)]
+
+
+# Generators for each mode: they take the block-aligned chunks and yield the output chunks
+
+def ecb_encrypt_chunks(chunks, engine):
+    for chunk, is_last in chunks:
+        if is_last:
+            chunk = pad(chunk)
+        yield engine.encrypt(chunk)
+
+
+def ecb_decrypt_chunks(chunks, engine):
+    for chunk, is_last in chunks:
+        if is_last and not chunk:
+            raise ValueError("Ciphertext length must be a non-zero multiple of 16 bytes.")
+        if len(chunk) % BLOCK_SIZE != 0:
+            raise ValueError("Ciphertext length must be a multiple of 16 bytes.")
+        data = engine.decrypt(chunk)
+        yield unpad(data) if is_last else data
+
+
+# CBC encryption is inherently sequential, so it runs block by block on the T-table engine
+def cbc_encrypt_chunks(chunks, cipher, iv):
+    previous = int.from_bytes(iv, "big")
+    for chunk, is_last in chunks:
+        if is_last:
+            chunk = pad(chunk)
+        out = []
+        for i in range(0, len(chunk), BLOCK_SIZE):
+            block = (int.from_bytes(chunk[i:i + BLOCK_SIZE], "big") ^ previous).to_bytes(BLOCK_SIZE, "big")
+            encrypted = cipher.encrypt_block(block)
+            previous = int.from_bytes(encrypted, "big")
+            out.append(encrypted)
+        yield b"".join(out)
+
+
+# CBC decryption is parallel over blocks: P_i = D(C_i) xor C_(i-1)
+def cbc_decrypt_chunks(chunks, engine, iv):
+    previous = iv
+    for chunk, is_last in chunks:
+        if is_last and not chunk:
+            raise ValueError("Ciphertext length must be a non-zero multiple of 16 bytes.")
+        if len(chunk) % BLOCK_SIZE != 0:
+            raise ValueError("Ciphertext length must be a multiple of 16 bytes.")
+        chained = np.frombuffer(previous + chunk[:-BLOCK_SIZE], dtype=np.uint8)
+        data = (np.frombuffer(engine.decrypt(chunk), dtype=np.uint8) ^ chained).tobytes()
+        previous = chunk[-BLOCK_SIZE:]
+        yield unpad(data) if is_last else data
+
+
+# CTR mode: a whole chunk of keystream is produced in one vectorized batch (same for encrypt and decrypt)
+def ctr_chunks(chunks, engine, iv):
+    counter = int.from_bytes(iv, "big")
+    for chunk, _ in chunks:
+        if not chunk:
+            continue
+        yield engine.keystream_xor(chunk, counter)
+        counter = (counter + (len(chunk) + BLOCK_SIZE - 1) // BLOCK_SIZE) & ((1 << 128) - 1)
+
+
+# Function to pick the block engine: serial by default, a process pool when parallel=True
+def make_engine(round_keys, rounds, parallel, workers, chunk_size):
+    if not parallel:
+        return BlockEngine(round_keys, rounds)
+    # Imported here because aes_parallel builds on the helpers of this module
+    from aes_parallel import ParallelBlockEngine
+    return ParallelBlockEngine(round_keys, rounds, workers, chunk_size)
+
+
+# Function to run a chunk pipeline on an engine that only exists while the stream is being consumed
+# The engine (and its worker processes and shared memory) is built on the first iteration, so a stream
+# that is never started holds nothing, and released once the stream is finished or abandoned
+def closing_stream(create_engine, pipeline):
+    engine = create_engine()
+    try:
+        yield from pipeline(engine)
+    finally:
+        engine.close()
+
+
+# Function to check the mode name
+def check_mode(mode):
+    mode = mode.lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}.")
+    return mode
+
+
+# Function for streaming encryption: yields ciphertext chunks without holding the whole message
+# With parallel=True, ECB and CTR chunks are split into shards and run on `workers` processes
+def encrypt_stream(source, key, rounds, mode="ctr", iv=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                   parallel=False, workers=None):
+    mode = check_mode(mode)
+    iv = check_iv(iv, mode)
+    chunks = aligned_chunks(source, chunk_size)
+    if mode == "cbc":
+        return cbc_encrypt_chunks(chunks, AES(key, rounds), iv)
+    create_engine = functools.partial(make_engine, expand_key_array(key, rounds), rounds, parallel, workers, chunk_size)
+    if mode == "ecb":
+        return closing_stream(create_engine, lambda engine: ecb_encrypt_chunks(chunks, engine))
+    return closing_stream(create_engine, lambda engine: ctr_chunks(chunks, engine, iv))
+
+
+# Function for streaming decryption: yields plaintext chunks without holding the whole message
+def decrypt_stream(source, key, rounds, mode="ctr", iv=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                   parallel=False, workers=None):
+    mode = check_mode(mode)
+    iv = check_iv(iv, mode)
+    create_engine = functools.partial(make_engine, expand_key_array(key, rounds), rounds, parallel, workers, chunk_size)
+    if mode == "ctr":
+        chunks = aligned_chunks(source, chunk_size)
+        return closing_stream(create_engine, lambda engine: ctr_chunks(chunks, engine, iv))
+    chunks = aligned_chunks(source, chunk_size, hold_back=True)
+    if mode == "ecb":
+        return closing_stream(create_engine, lambda engine: ecb_decrypt_chunks(chunks, engine))
+    return closing_stream(create_engine, lambda engine: cbc_decrypt_chunks(chunks, engine, iv))
+
+
+# Function to write every chunk of a stream to an output path, returns the number of bytes written
+def write_stream(chunks, destination):
+    written = 0
+    with open(destination, "wb") as handle:
+        for chunk in chunks:
+            handle.write(chunk)
+            written += len(chunk)
+    return written
+
+
+# Function to encrypt a file into another file chunk by chunk
+def encrypt_file(source_path, destination_path, key, rounds, mode="ctr", iv=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 parallel=False, workers=None):
+    chunks = encrypt_stream(source_path, key, rounds, mode, iv, chunk_size, parallel, workers)
+    return write_stream(chunks, destination_path)
+
+
+# Function to decrypt a file into another file chunk by chunk
+def decrypt_file(source_path, destination_path, key, rounds, mode="ctr", iv=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 parallel=False, workers=None):
+    chunks = decrypt_stream(source_path, key, rounds, mode, iv, chunk_size, parallel, workers)
+    return write_stream(chunks, destination_path)
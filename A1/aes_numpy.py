@@ -0,0 +1,88 @@
+import numpy as np
+
+from tables import s_box, inv_s_box, xtime
+from aes_implementation import expand_key
+
+# Lookup tables as NumPy arrays so SubBytes / xtime become a single fancy-index over all blocks
+S_BOX = np.array(s_box, dtype=np.uint8)
+INV_S_BOX = np.array(inv_s_box, dtype=np.uint8)
+XTIME = np.array(xtime, dtype=np.uint8)
+
+# The 16 state bytes are stored column by column (byte i is row i % 4 of column i // 4),
+# so ShiftRows is a fixed gather: row r of column c comes from column (c + r) % 4
+SHIFT_ROWS = np.array([(i % 4) + 4 * ((i // 4 + i % 4) % 4) for i in range(16)], dtype=np.intp)
+INV_SHIFT_ROWS = np.array([(i % 4) + 4 * ((i // 4 - i % 4) % 4) for i in range(16)], dtype=np.intp)
+
+
+# Function to expand the key into a (rounds + 1, 16) array of round keys
+def expand_key_array(key, rounds):
+    # expand_key always starts from the whole key, which can exceed the words needed for few rounds
+    expanded_key = np.array(expand_key(key, rounds)[:4 * (rounds + 1)], dtype=np.uint8)
+    return expanded_key.reshape(rounds + 1, 16)
+
+
+# Function to check and convert the input into an (N, 16) uint8 array
+def as_block_array(blocks):
+    blocks = np.asarray(blocks, dtype=np.uint8)
+    if blocks.ndim != 2 or blocks.shape[1] != 16:
+        raise ValueError("Blocks must be an (N, 16) array of bytes.")
+    return blocks
+
+
+# Function to apply MixColumns to every column of every state at once
+def mix_columns_batch(state):
+    columns = state.reshape(-1, 4, 4)
+    a0, a1, a2, a3 = columns[:, :, 0], columns[:, :, 1], columns[:, :, 2], columns[:, :, 3]
+    t = a0 ^ a1 ^ a2 ^ a3
+    mixed = np.empty_like(columns)
+    mixed[:, :, 0] = a0 ^ t ^ XTIME[a0 ^ a1]
+    mixed[:, :, 1] = a1 ^ t ^ XTIME[a1 ^ a2]
+    mixed[:, :, 2] = a2 ^ t ^ XTIME[a2 ^ a3]
+    mixed[:, :, 3] = a3 ^ t ^ XTIME[a3 ^ a0]
+    return mixed.reshape(-1, 16)
+
+
+# Function to apply InvMixColumns (same preprocessing trick as inverse_mix_columns, then MixColumns)
+def inverse_mix_columns_batch(state):
+    columns = state.reshape(-1, 4, 4).copy()
+    u = XTIME[XTIME[columns[:, :, 0] ^ columns[:, :, 2]]]
+    v = XTIME[XTIME[columns[:, :, 1] ^ columns[:, :, 3]]]
+    columns[:, :, 0] ^= u
+    columns[:, :, 1] ^= v
+    columns[:, :, 2] ^= u
+    columns[:, :, 3] ^= v
+    return mix_columns_batch(columns)
+
+
+# Function to encrypt an (N, 16) array of blocks with an already expanded round key array
+def encrypt_blocks_with_round_keys(blocks, round_keys, rounds):
+    state = as_block_array(blocks) ^ round_keys[0]
+    for round in range(1, rounds):
+        state = S_BOX[state][:, SHIFT_ROWS]
+        state = mix_columns_batch(state)
+        state ^= round_keys[round]
+    state = S_BOX[state][:, SHIFT_ROWS]
+    state ^= round_keys[rounds]
+    return state
+
+
+# Function to decrypt an (N, 16) array of blocks with an already expanded round key array
+def decrypt_blocks_with_round_keys(blocks, round_keys, rounds):
+    state = as_block_array(blocks) ^ round_keys[rounds]
+    state = INV_S_BOX[state[:, INV_SHIFT_ROWS]]
+    for round in range(rounds - 1, 0, -1):
+        state ^= round_keys[round]
+        state = inverse_mix_columns_batch(state)
+        state = INV_S_BOX[state[:, INV_SHIFT_ROWS]]
+    state ^= round_keys[0]
+    return state
+
+
+# Function for batched encryption: (N, 16) uint8 plaintexts -> (N, 16) uint8 ciphertexts
+def encrypt_blocks_numpy(blocks, key, rounds):
+    return encrypt_blocks_with_round_keys(blocks, expand_key_array(key, rounds), rounds)
+
+
+# Function for batched decryption: (N, 16) uint8 ciphertexts -> (N, 16) uint8 plaintexts
+def decrypt_blocks_numpy(blocks, key, rounds):
+    return decrypt_blocks_with_round_keys(blocks, expand_key_array(key, rounds), rounds)
@@ -0,0 +1,109 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from aes_numpy import encrypt_blocks_with_round_keys, decrypt_blocks_with_round_keys
+from aes_modes import BLOCK_SIZE, BlockEngine, ctr_xor
+
+# Chunks smaller than this are not worth shipping to the pool and run in the calling process
+MIN_PARALLEL_BYTES = 1 << 16
+
+# Round keys of the worker process, set once by init_worker instead of being sent with every shard
+worker_round_keys = None
+worker_rounds = None
+
+
+# Function run once in every worker process
+def init_worker(round_keys, rounds):
+    global worker_round_keys, worker_rounds
+    worker_round_keys = round_keys
+    worker_rounds = rounds
+
+
+# Function run by the workers: processes bytes [start, stop) of the shared buffer in place
+# operation is "encrypt" / "decrypt" (ECB) or "ctr"; counter is the CTR counter of the shard's first block
+def process_shard(name, operation, start, stop, counter):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        data = np.ndarray((stop - start,), dtype=np.uint8, buffer=shm.buf, offset=start)
+        if operation == "ctr":
+            data[:] = ctr_xor(data, counter, worker_round_keys, worker_rounds)
+        elif operation == "encrypt":
+            data[:] = encrypt_blocks_with_round_keys(data.reshape(-1, BLOCK_SIZE), worker_round_keys, worker_rounds).reshape(-1)
+        else:
+            data[:] = decrypt_blocks_with_round_keys(data.reshape(-1, BLOCK_SIZE), worker_round_keys, worker_rounds).reshape(-1)
+        # The array view must be released before the shared memory can be closed
+        del data
+    finally:
+        shm.close()
+    return stop - start
+
+
+# Block engine backed by a process pool: each chunk is copied once into shared memory, split into
+# block-aligned shards that the workers transform in place, and read back in the original order.
+class ParallelBlockEngine:
+
+    def __init__(self, round_keys, rounds, workers=None, chunk_size=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.serial = BlockEngine(round_keys, rounds)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(round_keys, rounds))
+        self.shm = None
+        if chunk_size:
+            self.reserve(chunk_size + BLOCK_SIZE)
+
+    # Function to make sure the shared buffer can hold `size` bytes
+    def reserve(self, size):
+        if self.shm is not None and self.shm.size >= size:
+            return
+        self.release()
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+    def release(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    # Function to split `length` bytes into at most `workers` block-aligned (start, stop) ranges
+    def shards(self, length):
+        blocks = (length + BLOCK_SIZE - 1) // BLOCK_SIZE
+        per_shard = (blocks + self.workers - 1) // self.workers
+        step = per_shard * BLOCK_SIZE
+        return [(start, min(start + step, length)) for start in range(0, length, step)]
+
+    def run(self, operation, data, counter=0):
+        length = len(data)
+        self.reserve(length)
+        self.shm.buf[:length] = data
+        futures = [
+            self.pool.submit(process_shard, self.shm.name, operation, start, stop,
+                             (counter + start // BLOCK_SIZE) & ((1 << 128) - 1))
+            for start, stop in self.shards(length)
+        ]
+        for future in futures:
+            future.result()
+        return bytes(self.shm.buf[:length])
+
+    # ECB-encrypt a block-aligned byte string
+    def encrypt(self, data):
+        if len(data) < MIN_PARALLEL_BYTES:
+            return self.serial.encrypt(data)
+        return self.run("encrypt", data)
+
+    # ECB-decrypt a block-aligned byte string
+    def decrypt(self, data):
+        if len(data) < MIN_PARALLEL_BYTES:
+            return self.serial.decrypt(data)
+        return self.run("decrypt", data)
+
+    # XOR data with the CTR keystream starting at the given counter value
+    def keystream_xor(self, data, counter):
+        if len(data) < MIN_PARALLEL_BYTES:
+            return self.serial.keystream_xor(data, counter)
+        return self.run("ctr", data, counter)
+
+    def close(self):
+        self.pool.shutdown()
+        self.release()
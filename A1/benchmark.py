@@ -0,0 +1,283 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from aes_implementation import (perform_encryption, perform_decryption, expand_key,
+                                convert_matrix_to_bytes, convert_bytes_to_matrix)
+from aes_fast import AES
+from aes_inplace import InPlaceAES
+from aes_numpy import encrypt_blocks_numpy, decrypt_blocks_numpy, expand_key_array
+from aes_bitslice import bitsliced_encrypt_blocks, bitsliced_decrypt_blocks
+from aes_modes import BLOCK_SIZE, encrypt_stream, decrypt_stream
+from aes_parallel import MIN_PARALLEL_BYTES, ParallelBlockEngine
+
+# FIPS-197 Appendix C known-answer vectors: (key bits, rounds, key, plaintext, ciphertext)
+KNOWN_ANSWERS = [
+    (128, 10, "000102030405060708090a0b0c0d0e0f",
+     "00112233445566778899aabbccddeeff", "69c4e0d86a7b0430d8cdb78070b4c55a"),
+    (192, 12, "000102030405060708090a0b0c0d0e0f1011121314151617",
+     "00112233445566778899aabbccddeeff", "dda97ca4864cdfe06eaf70a0ec0d7191"),
+    (256, 14, "000102030405060708090a0b0c0d0e0f101112131415161718191a1b1c1d1e1f",
+     "00112233445566778899aabbccddeeff", "8ea2b7ca516745bfeafc49904b496089"),
+]
+
+# NIST SP 800-38A F.5.1, F.5.3 and F.5.5 CTR vectors: (key bits, rounds, key, initial counter, plaintext, ciphertext)
+CTR_PLAINTEXT = ("6bc1bee22e409f96e93d7e117393172aae2d8a571e03ac9c9eb76fac45af8e51"
+                 "30c81c46a35ce411e5fbc1191a0a52eff69f2445df4f9b17ad2b417be66c3710")
+CTR_COUNTER = "f0f1f2f3f4f5f6f7f8f9fafbfcfdfeff"
+CTR_KNOWN_ANSWERS = [
+    (128, 10, "2b7e151628aed2a6abf7158809cf4f3c", CTR_COUNTER, CTR_PLAINTEXT,
+     "874d6191b620e3261bef6864990db6ce9806f66b7970fdff8617187bb9fffdff"
+     "5ae4df3edbd5d35e5b4f09020db03eab1e031dda2fbe03d1792170a0f3009cee"),
+    (192, 12, "8e73b0f7da0e6452c810f32b809079e562f8ead2522c6b7b", CTR_COUNTER, CTR_PLAINTEXT,
+     "1abc932417521ca24f2b0459fe7e6e0b090339ec0aa6faefd5ccc2c6f4ce8e94"
+     "1e36b26bd1ebc670d1bd1d665620abf74f78a7f6d29809585a97daec58c6b050"),
+    (256, 14, "603deb1015ca71be2b73aef0857d77811f352c073b6108d72d9810a30914dff4", CTR_COUNTER, CTR_PLAINTEXT,
+     "601ec313775789a5b7a7f504bbf3d228f443e3ca4d62b59aca84e990cacaf5c5"
+     "2b0930daa23de94ce87017ba2d84988ddfc9c58db67aada613c2dd08457941a6"),
+]
+
+DEFAULT_BATCH_SIZES = [1, 16, 256, 4096]
+
+# Extra batch sizes for the streaming engines: one default chunk (1 MiB), large enough for the process pool
+DEFAULT_STREAM_BATCH_SIZES = [1 << 16]
+
+# Size of the random message every streaming engine is checked on against the serial engines,
+# so the parallel engines run their workers during the checks too
+BULK_CHECK_BYTES = 4 * MIN_PARALLEL_BYTES
+
+
+# Every engine is exposed as a pair of functions: (data, key, rounds) -> data, with data made of 16-byte blocks
+
+def reference_encrypt(data, key, rounds):
+    return b"".join(convert_matrix_to_bytes(perform_encryption(data[i:i + 16], key, rounds))
+                    for i in range(0, len(data), 16))
+
+
+def reference_decrypt(data, key, rounds):
+    return b"".join(convert_matrix_to_bytes(perform_decryption(convert_bytes_to_matrix(data[i:i + 16]), key, rounds))
+                    for i in range(0, len(data), 16))
+
+
+def inplace_encrypt(data, key, rounds):
+    buffer = bytearray(data)
+    InPlaceAES(key, rounds).encrypt_buffer(buffer)
+    return bytes(buffer)
+
+
+def inplace_decrypt(data, key, rounds):
+    buffer = bytearray(data)
+    InPlaceAES(key, rounds).decrypt_buffer(buffer)
+    return bytes(buffer)
+
+
+def block_array_engine(function):
+    def run(data, key, rounds):
+        blocks = np.frombuffer(data, dtype=np.uint8).reshape(-1, 16)
+        return function(blocks, key, rounds).tobytes()
+    return run
+
+
+# Streaming ECB pads the message: the full padding block added to block-aligned data is dropped after
+# encryption, and put back (encrypted) before decryption
+def stream_ecb_engine(parallel):
+    def encrypt(data, key, rounds):
+        return b"".join(encrypt_stream(data, key, rounds, "ecb", parallel=parallel))[:len(data)]
+
+    def decrypt(data, key, rounds):
+        padding_block = AES(key, rounds).encrypt_block(bytes([BLOCK_SIZE]) * BLOCK_SIZE)
+        return b"".join(decrypt_stream(data + padding_block, key, rounds, "ecb", parallel=parallel))
+    return encrypt, decrypt
+
+
+# Streaming CTR from the SP 800-38A initial counter (encryption and decryption are the same operation)
+def stream_ctr_engine(parallel):
+    def run(data, key, rounds):
+        return b"".join(encrypt_stream(data, key, rounds, "ctr", iv=bytes.fromhex(CTR_COUNTER), parallel=parallel))
+    return run, run
+
+
+ENGINES = {
+    "reference": (reference_encrypt, reference_decrypt),
+    "ttable": (lambda data, key, rounds: AES(key, rounds).encrypt_blocks(data),
+               lambda data, key, rounds: AES(key, rounds).decrypt_blocks(data)),
+    "inplace": (inplace_encrypt, inplace_decrypt),
+    "numpy": (block_array_engine(encrypt_blocks_numpy), block_array_engine(decrypt_blocks_numpy)),
+    "bitslice": (block_array_engine(bitsliced_encrypt_blocks), block_array_engine(bitsliced_decrypt_blocks)),
+    "stream-ecb": stream_ecb_engine(parallel=False),
+    "stream-ctr": stream_ctr_engine(parallel=False),
+    "parallel-ecb": stream_ecb_engine(parallel=True),
+    "parallel-ctr": stream_ctr_engine(parallel=True),
+}
+
+# Engines that are not plain ECB, checked against their own vectors (every other engine is ECB)
+ENGINE_MODES = {"stream-ctr": "ctr", "parallel-ctr": "ctr"}
+
+# Streaming engines: also checked on a bulk message and timed on the stream batch sizes
+STREAM_ENGINES = ["stream-ecb", "stream-ctr", "parallel-ecb", "parallel-ctr"]
+
+# Engines backed by a process pool: checked through the stream API, but timed on a ParallelBlockEngine
+# kept open for the whole measurement (encrypt_stream would start a new pool on every call)
+PARALLEL_ENGINES = ["parallel-ecb", "parallel-ctr"]
+
+
+# Function to check every engine against the FIPS-197 vectors (SP 800-38A for CTR), returns the list of failures
+def run_known_answer_tests(engines):
+    failures = []
+    for name in engines:
+        encrypt, decrypt = ENGINES[name]
+        if ENGINE_MODES.get(name) == "ctr":
+            for key_bits, rounds, key, _, plaintext, ciphertext in CTR_KNOWN_ANSWERS:
+                key, plaintext, ciphertext = bytes.fromhex(key), bytes.fromhex(plaintext), bytes.fromhex(ciphertext)
+                if encrypt(plaintext, key, rounds) != ciphertext:
+                    failures.append(f"{name}: AES-{key_bits} encryption")
+                if decrypt(ciphertext, key, rounds) != plaintext:
+                    failures.append(f"{name}: AES-{key_bits} decryption")
+        else:
+            for key_bits, rounds, key, plaintext, ciphertext in KNOWN_ANSWERS:
+                key, plaintext, ciphertext = bytes.fromhex(key), bytes.fromhex(plaintext), bytes.fromhex(ciphertext)
+                # Several copies of the vector, so the batch engines are checked on more than one block
+                if encrypt(plaintext * 3, key, rounds) != ciphertext * 3:
+                    failures.append(f"{name}: AES-{key_bits} encryption")
+                if decrypt(ciphertext * 3, key, rounds) != plaintext * 3:
+                    failures.append(f"{name}: AES-{key_bits} decryption")
+        if name in STREAM_ENGINES:
+            failures.extend(run_bulk_check(name))
+    return failures
+
+
+# Function to check a streaming engine on a message large enough for the process pool, against the
+# T-table engine (ECB) or the serial stream (CTR), returns the list of failures
+def run_bulk_check(name):
+    failures = []
+    encrypt, decrypt = ENGINES[name]
+    expected_encrypt = ENGINES["stream-ctr" if ENGINE_MODES.get(name) == "ctr" else "ttable"][0]
+    for key_bits, rounds, _, _, _ in KNOWN_ANSWERS:
+        key, data = os.urandom(key_bits // 8), os.urandom(BULK_CHECK_BYTES)
+        ciphertext = encrypt(data, key, rounds)
+        if ciphertext != expected_encrypt(data, key, rounds):
+            failures.append(f"{name}: AES-{key_bits} bulk encryption")
+        if decrypt(ciphertext, key, rounds) != data:
+            failures.append(f"{name}: AES-{key_bits} bulk decryption")
+    return failures
+
+
+# Function to call `function` repeatedly for at least `min_time` seconds, returns (calls, seconds)
+def time_calls(function, min_time):
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls, elapsed
+
+
+# Function to start a ParallelBlockEngine for one key, returns (engine, (encrypt, decrypt), setup seconds)
+# The timed functions take the data only, so the pool and the shared memory are reused across calls;
+# setup includes one warm-up chunk, so the worker processes are already running when the timing starts
+def open_parallel_engine(name, key, rounds, chunk_size):
+    start = time.perf_counter()
+    engine = ParallelBlockEngine(expand_key_array(key, rounds), rounds, chunk_size=chunk_size)
+    engine.encrypt(bytes(chunk_size))
+    setup = time.perf_counter() - start
+    if ENGINE_MODES.get(name) == "ctr":
+        counter = int.from_bytes(bytes.fromhex(CTR_COUNTER), "big")
+        keystream_xor = lambda data: engine.keystream_xor(data, counter)
+        return engine, (keystream_xor, keystream_xor), setup
+    return engine, (engine.encrypt, engine.decrypt), setup
+
+
+# Function to time every engine, key size, operation and batch size
+# The streaming engines are also timed on stream_batch_sizes, where the parallel engines use their workers.
+# The parallel engines are timed on one engine per key (their setup cost is reported on its own),
+# the other engines through their (data, key, rounds) functions
+def run_benchmarks(engines, batch_sizes, min_time, stream_batch_sizes=()):
+    results = []
+    for name in engines:
+        sizes = list(batch_sizes) + (list(stream_batch_sizes) if name in STREAM_ENGINES else [])
+        for key_bits, rounds, _, _, _ in KNOWN_ANSWERS:
+            key = os.urandom(key_bits // 8)
+            engine, setup = None, None
+            if name in PARALLEL_ENGINES:
+                engine, functions, setup = open_parallel_engine(name, key, rounds, max(MIN_PARALLEL_BYTES, 16 * max(sizes)))
+                print(f"{name:>12} setup   AES-{key_bits}: {setup * 1e3:12.1f} ms")
+            else:
+                functions = [lambda data, function=function: function(data, key, rounds) for function in ENGINES[name]]
+            try:
+                for operation, function in zip(("encrypt", "decrypt"), functions):
+                    for batch in sizes:
+                        data = os.urandom(16 * batch)
+                        calls, seconds = time_calls(lambda: function(data), min_time)
+                        blocks = calls * batch
+                        results.append({
+                            "engine": name,
+                            "operation": operation,
+                            "key_bits": key_bits,
+                            "batch": batch,
+                            "blocks": blocks,
+                            "seconds": seconds,
+                            "blocks_per_sec": blocks / seconds,
+                            "mb_per_sec": 16 * blocks / seconds / 1e6,
+                            "setup_seconds": setup,
+                        })
+                        print(f"{name:>12} {operation:>7} AES-{key_bits} batch {batch:>6}: "
+                              f"{blocks / seconds:12.1f} blocks/s {16 * blocks / seconds / 1e6:9.3f} MB/s")
+            finally:
+                if engine is not None:
+                    engine.close()
+    return results
+
+
+# Function to time the key expansion on its own for every key size
+def run_key_expansion_benchmarks(min_time):
+    results = []
+    for key_bits, rounds, _, _, _ in KNOWN_ANSWERS:
+        key = os.urandom(key_bits // 8)
+        calls, seconds = time_calls(lambda: expand_key(key, rounds), min_time)
+        results.append({"key_bits": key_bits, "calls": calls, "seconds": seconds, "per_sec": calls / seconds})
+        print(f"expand_key AES-{key_bits}: {calls / seconds:12.1f} expansions/s")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Known-answer tests and benchmarks for the AES engines.")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--stream-batch-sizes", nargs="*", type=int, default=DEFAULT_STREAM_BATCH_SIZES,
+                        help="extra batch sizes (in blocks) for the streaming engines")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds spent per measurement")
+    parser.add_argument("--output", default="aes_benchmark.json", help="path of the JSON report")
+    args = parser.parse_args(argv)
+
+    # Nothing is timed unless every engine passes the known-answer tests
+    failures = run_known_answer_tests(args.engines)
+    if failures:
+        print("Known-answer tests FAILED:")
+        for failure in failures:
+            print("  " + failure)
+        return 1
+    print(f"Known-answer tests passed for: {', '.join(args.engines)}\n")
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "min_time": args.min_time,
+        "key_expansion": run_key_expansion_benchmarks(args.min_time),
+        "results": run_benchmarks(args.engines, args.batch_sizes, args.min_time, args.stream_batch_sizes),
+    }
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
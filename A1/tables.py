@@ -44,6 +44,9 @@ s_box = (
     0x8C, 0xA1, 0x89, 0x0D, 0xBF, 0xE6, 0x42, 0x68, 0x41, 0x99, 0x2D, 0x0F, 0xB0, 0x54, 0xBB, 0x16,
 )
 
+# xtime table : multiplication by 2 in GF(2^8), used by MixColumns and InvMixColumns
+xtime = tuple(((a << 1) ^ 0x1B) & 0xFF if a & 0x80 else a << 1 for a in range(256))
+
 # Function to get a round constant value by index (for AES key schedule)
 def get_r_con_value(index):
  
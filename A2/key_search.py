@@ -0,0 +1,179 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from toy_cipher import T0, T1, T2, T3, Inv_Sbox, pack_state, unpack_state
+
+# Vectorized exhaustive key search for the Toy Cipher.
+# Keys and states are packed 32-bit ints (see pack_state), so a whole slab of candidate keys
+# is encrypted at once with the combined SB + LM tables as NumPy arrays.
+
+ROUND_TABLES = np.array([T0, T1, T2, T3], dtype=np.uint32)
+INVERSE_SBOX = np.array(Inv_Sbox, dtype=np.uint32)
+
+# Number of candidate keys encrypted together (2^20 keys = 4 MiB per uint32 array)
+DEFAULT_SLAB_SIZE = 2**20
+
+
+# Function to encrypt packed plaintexts under packed keys (NumPy arrays or ints, broadcast together)
+def TC1_Enc_batch(plaintexts, keys, rounds=10):
+    keys = np.asarray(keys, dtype=np.uint32)
+    state = np.asarray(plaintexts, dtype=np.uint32)
+    for _ in range(rounds):
+        state = state ^ keys
+        state = (ROUND_TABLES[0][state >> 24] ^ ROUND_TABLES[1][(state >> 16) & 0xFF]
+                 ^ ROUND_TABLES[2][(state >> 8) & 0xFF] ^ ROUND_TABLES[3][state & 0xFF])
+    return state
+
+
+# Function to decrypt packed ciphertexts under packed keys (inverse of TC1_Enc_batch, see TC1_Dec_packed)
+def TC1_Dec_batch(ciphertexts, keys, rounds=10):
+    keys = np.asarray(keys, dtype=np.uint32)
+    state = np.asarray(ciphertexts, dtype=np.uint32)
+    for _ in range(rounds):
+        folded = state ^ (state >> 16)
+        folded = folded ^ (folded >> 8)
+        state = state ^ ((folded & 0xFF) * np.uint32(0x01010101))
+        state = ((INVERSE_SBOX[state >> 24] << 24) | (INVERSE_SBOX[(state >> 16) & 0xFF] << 16)
+                 | (INVERSE_SBOX[(state >> 8) & 0xFF] << 8) | INVERSE_SBOX[state & 0xFF])
+        state = state ^ keys
+    return state
+
+
+# Function to find every key in [start, stop) that maps each plaintext to its ciphertext
+# Candidates are filtered on the first pair, and only the survivors are checked against the others.
+def search_key_range(packed_pairs, start, stop, slab_size=DEFAULT_SLAB_SIZE, rounds=10):
+    (first_plaintext, first_ciphertext), rest = packed_pairs[0], packed_pairs[1:]
+    found = []
+    for slab_start in range(start, stop, slab_size):
+        keys = np.arange(slab_start, min(slab_start + slab_size, stop), dtype=np.uint32)
+        survivors = keys[TC1_Enc_batch(first_plaintext, keys, rounds) == first_ciphertext]
+        for plaintext, ciphertext in rest:
+            if survivors.size == 0:
+                break
+            survivors = survivors[TC1_Enc_batch(plaintext, survivors, rounds) == ciphertext]
+        found.extend(int(key) for key in survivors)
+    return found
+
+
+# Function to turn the known pairs (lists of 4 bytes) into packed ints
+def pack_pairs(plaintexts, ciphertexts):
+    pairs = [(pack_state(p), pack_state(c)) for p, c in zip(plaintexts, ciphertexts)]
+    if not pairs:
+        raise ValueError("At least one plaintext-ciphertext pair is needed.")
+    return pairs
+
+
+# Function for the vectorized exhaustive search: returns every matching key (not only the first one)
+# By default the first key byte is fixed to 0x00 like exhaustive_search (2^24 keys);
+# with fix_first_byte=False the full 2^32 key space is searched.
+def exhaustive_search_vectorized(plaintexts, ciphertexts, fix_first_byte=True, slab_size=DEFAULT_SLAB_SIZE, rounds=10):
+    packed_pairs = pack_pairs(plaintexts, ciphertexts)
+    stop = 2**24 if fix_first_byte else 2**32
+    return [unpack_state(key) for key in search_key_range(packed_pairs, 0, stop, slab_size, rounds)]
+
+
+# Multi-process search: the key space is cut into fixed-size ranges handled by a process pool.
+# Finished ranges are recorded in a small JSON checkpoint so a killed run resumes where it stopped,
+# and a shared event lets every worker stop early once a key has been found.
+
+# Number of keys per range: one unit of work and of checkpointing
+DEFAULT_RANGE_SIZE = 2**22
+
+# Event shared with the workers (set by init_search_worker)
+stop_event = None
+
+
+# Function run once in every worker process
+def init_search_worker(event):
+    global stop_event
+    stop_event = event
+
+
+# Function run by the workers: searches one range slab by slab, giving up if another worker found the key
+# Returns (range index, keys found, keys checked, seconds, worker pid, whether the range was finished)
+def search_range_task(index, packed_pairs, start, stop, slab_size, rounds):
+    begin = time.perf_counter()
+    found = []
+    checked = 0
+    for slab_start in range(start, stop, slab_size):
+        if stop_event is not None and stop_event.is_set():
+            return index, found, checked, time.perf_counter() - begin, os.getpid(), False
+        slab_stop = min(slab_start + slab_size, stop)
+        found.extend(search_key_range(packed_pairs, slab_start, slab_stop, slab_size, rounds))
+        checked += slab_stop - slab_start
+    return index, found, checked, time.perf_counter() - begin, os.getpid(), True
+
+
+# Function to load the checkpoint, or start a new one; refuses a checkpoint made for another search
+def load_checkpoint(path, parameters):
+    if path is None or not os.path.exists(path):
+        return {"parameters": parameters, "done": [], "found": []}
+    with open(path) as handle:
+        checkpoint = json.load(handle)
+    if checkpoint.get("parameters") != parameters:
+        raise ValueError(f"Checkpoint {path} was written for a different search.")
+    return checkpoint
+
+
+# Function to write the checkpoint atomically (a kill while writing leaves the previous one intact)
+def save_checkpoint(path, checkpoint):
+    if path is None:
+        return
+    temporary = path + ".tmp"
+    with open(temporary, "w") as handle:
+        json.dump(checkpoint, handle)
+    os.replace(temporary, path)
+
+
+# Function for the parallel, resumable exhaustive search
+# Returns a dict with the keys found, the number of ranges finished and the keys/sec of every worker.
+def parallel_exhaustive_search(plaintexts, ciphertexts, workers=None, fix_first_byte=True, stop_on_first=True,
+                               checkpoint_path=None, range_size=DEFAULT_RANGE_SIZE, slab_size=DEFAULT_SLAB_SIZE,
+                               rounds=10, verbose=False):
+    packed_pairs = pack_pairs(plaintexts, ciphertexts)
+    keyspace = 2**24 if fix_first_byte else 2**32
+    # The pairs are stored as lists, the form they take after a JSON round trip
+    parameters = {"pairs": [list(p) for p in packed_pairs], "keyspace": keyspace,
+                  "range_size": range_size, "rounds": rounds}
+    checkpoint = load_checkpoint(checkpoint_path, parameters)
+
+    done = set(checkpoint["done"])
+    found = set(checkpoint["found"])
+    ranges = [i for i in range((keyspace + range_size - 1) // range_size) if i not in done]
+    worker_stats = {}
+
+    if ranges and not (stop_on_first and found):
+        event = multiprocessing.Event()
+        with ProcessPoolExecutor(workers, initializer=init_search_worker, initargs=(event,)) as pool:
+            futures = [pool.submit(search_range_task, i, packed_pairs, i * range_size,
+                                   min((i + 1) * range_size, keyspace), slab_size, rounds) for i in ranges]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                index, keys, checked, seconds, pid, finished = future.result()
+                checked_total, seconds_total = worker_stats.get(pid, (0, 0.0))
+                worker_stats[pid] = (checked_total + checked, seconds_total + seconds)
+                found.update(keys)
+                if finished:
+                    done.add(index)
+                checkpoint["done"], checkpoint["found"] = sorted(done), sorted(found)
+                save_checkpoint(checkpoint_path, checkpoint)
+                if verbose:
+                    print(f"Range {index}: {checked} keys in {seconds:.2f}s "
+                          f"({checked / max(seconds, 1e-9):.0f} keys/s, worker {pid}), {len(done)} ranges done")
+                if stop_on_first and found:
+                    event.set()
+                    for pending in futures:
+                        pending.cancel()
+
+    return {
+        "keys": [unpack_state(key) for key in sorted(found)],
+        "ranges_done": len(done),
+        "ranges_total": (keyspace + range_size - 1) // range_size,
+        "keys_per_second": {pid: checked / seconds for pid, (checked, seconds) in worker_stats.items() if seconds > 0},
+    }
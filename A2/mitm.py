@@ -0,0 +1,85 @@
+import numpy as np
+
+from toy_cipher import TC1_Enc_packed, pack_state, unpack_state
+from key_search import TC1_Enc_batch, TC1_Dec_batch, pack_pairs, DEFAULT_SLAB_SIZE
+
+# Meet-in-the-middle attack on the Toy Cipher with two independent keys:
+#   C = TC1_Enc(TC1_Enc(P, k1, rounds_1), k2, rounds_2)
+# rounds_1 = rounds_2 = 10 is double encryption; smaller values give reduced-round variants whose two
+# halves use independent round keys.
+# The middle state TC1_Enc(P, k1) is computed for every k1 and sorted; every k2 then decrypts C one half
+# and looks its middle state up in the sorted table. For 2^key_bits keys per half this costs about
+# 2 * 2^key_bits encryptions and 2^key_bits table entries instead of the 2^(2 * key_bits) encryptions of
+# an exhaustive search over both keys.
+
+
+# Function for the double encryption on packed ints
+def double_encrypt_packed(plaintext, key_1, key_2, rounds_1=10, rounds_2=10):
+    return TC1_Enc_packed(TC1_Enc_packed(plaintext, key_1, rounds_1), key_2, rounds_2)
+
+
+# Function with the same interface as TC1_Enc (lists of 4 bytes)
+def double_encrypt(plaintext, key_1, key_2, rounds_1=10, rounds_2=10):
+    return unpack_state(double_encrypt_packed(pack_state(plaintext), pack_state(key_1), pack_state(key_2),
+                                              rounds_1, rounds_2))
+
+
+# Function to build the sorted middle-state table: (sorted middle states, k1 of every entry)
+def build_middle_table(plaintext, key_bits, rounds_1=10, slab_size=DEFAULT_SLAB_SIZE):
+    keys = np.arange(2**key_bits, dtype=np.uint32)
+    middle = np.empty_like(keys)
+    for start in range(0, keys.size, slab_size):
+        middle[start:start + slab_size] = TC1_Enc_batch(plaintext, keys[start:start + slab_size], rounds_1)
+    order = np.argsort(middle, kind="stable")
+    return middle[order], keys[order]
+
+
+# Function to find the (k1, k2) candidates of one slab of k2 values whose middle states meet in the table
+def match_slab(sorted_middle, sorted_keys, ciphertext, keys_2, rounds_2):
+    middle = TC1_Dec_batch(ciphertext, keys_2, rounds_2)
+    left = np.searchsorted(sorted_middle, middle, side="left")
+    counts = np.searchsorted(sorted_middle, middle, side="right") - left
+    hits = np.flatnonzero(counts)
+    if hits.size == 0:
+        return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint32)
+    # Several k1 can share a middle state: expand every hit into its whole run of equal entries
+    counts = counts[hits]
+    run_starts = np.repeat(left[hits], counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return sorted_keys[run_starts + offsets], np.repeat(keys_2[hits], counts)
+
+
+# Function for the meet-in-the-middle attack: returns every (k1, k2) consistent with all the pairs
+# Both keys are searched among the 2^key_bits smallest values (key_bits=24 fixes the first byte to 0x00,
+# like exhaustive_search). The table takes 8 * 2^key_bits bytes.
+# With 2^(2 * key_bits) key pairs and 32-bit blocks, about 2 * key_bits / 32 pairs are needed
+# for the right keys to be the only survivors.
+def meet_in_the_middle(plaintexts, ciphertexts, key_bits=24, rounds_1=10, rounds_2=10,
+                       slab_size=DEFAULT_SLAB_SIZE):
+    packed_pairs = pack_pairs(plaintexts, ciphertexts)
+    (first_plaintext, first_ciphertext), rest = packed_pairs[0], packed_pairs[1:]
+    sorted_middle, sorted_keys = build_middle_table(first_plaintext, key_bits, rounds_1, slab_size)
+
+    found = []
+    for start in range(0, 2**key_bits, slab_size):
+        keys_2 = np.arange(start, min(start + slab_size, 2**key_bits), dtype=np.uint32)
+        keys_1, keys_2 = match_slab(sorted_middle, sorted_keys, first_ciphertext, keys_2, rounds_2)
+        # The other pairs filter out the false matches
+        for plaintext, ciphertext in rest:
+            if keys_1.size == 0:
+                break
+            valid = TC1_Enc_batch(TC1_Enc_batch(plaintext, keys_1, rounds_1), keys_2, rounds_2) == ciphertext
+            keys_1, keys_2 = keys_1[valid], keys_2[valid]
+        found.extend((unpack_state(int(k1)), unpack_state(int(k2))) for k1, k2 in zip(keys_1, keys_2))
+    return found
+
+
+if __name__ == "__main__":
+    key_1 = [0x00, 0x3C, 0x5A, 0x96]
+    key_2 = [0x00, 0xE1, 0x07, 0x42]
+    plaintexts = [[0x00, 0x00, 0x00, 0x00], [0x01, 0x02, 0x03, 0x04], [0x12, 0x34, 0x56, 0x78]]
+    ciphertexts = [double_encrypt(p, key_1, key_2) for p in plaintexts]
+
+    # 2^24 keys per half: about 2^25 encryptions instead of 2^48 for an exhaustive search
+    print("Double encryption, first key byte of both keys fixed to 0x00:")
+    print(f"Found keys: {meet_in_the_middle(plaintexts, ciphertexts)}")
@@ -0,0 +1,342 @@
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from toy_cipher import TC1_Enc_packed, pack_state, unpack_state
+from key_search import TC1_Enc_batch
+
+# Time-memory trade-off (TMTO) engine for the Toy Cipher.
+# The one-way function is f(k) = R(TC1_Enc(P, k)) for a fixed chosen plaintext P, so a ciphertext C of P
+# gives R(C) = f(k): the online phase computes forward from the ciphertext and only has to look up endpoints.
+#   - Rainbow tables use a different reduction R_i in every column, so two chains only merge when they
+#     collide in the same column.
+#   - Distinguished-point (DP) tables use one reduction per table and stop every chain at the first point
+#     whose low `dp_bits` bits are zero; merged chains then end on the same endpoint.
+# Keys and states are packed 32-bit ints (see toy_cipher.pack_state). With key_bits < 32 the reduction
+# maps into the low key_bits bits only, which gives small key spaces for checking the TMTO estimates.
+
+MASK_32 = 0xFFFFFFFF
+
+
+# Function giving the reduction constant of a column (rainbow) or of a whole table (DP, column 0)
+def reduction_constant(column, table_index=0):
+    return ((column + 1) * 0x9E3779B9 + table_index * 0x7F4A7C15) & MASK_32
+
+
+# Function applying the reduction to a uint32 array: XOR with a constant, then keep the low key_bits bits
+def reduce_value(values, column, table_index=0, key_bits=32):
+    return (values ^ np.uint32(reduction_constant(column, table_index))) & np.uint32((1 << key_bits) - 1)
+
+
+# Function for one step of a chain: the next key is R(E_k(P))
+def chain_step(plaintext, keys, column, table_index=0, rounds=10, key_bits=32):
+    return reduce_value(TC1_Enc_batch(plaintext, keys, rounds), column, table_index, key_bits)
+
+
+# Precomputed table: start and end points of every chain plus the parameters needed to walk them again.
+# The chains are kept sorted by endpoint with one chain per endpoint (see deduplicate_chains),
+# so looking an endpoint up is a binary search over a uint32 array instead of a scan of the table.
+class TMTOTable:
+
+    def __init__(self, kind, plaintext, start_points, end_points, chain_length, table_index=0, dp_bits=0,
+                 chain_lengths=None, merged_chains=0, rounds=10, key_bits=32):
+        self.kind = kind  # "rainbow" or "dp"
+        self.plaintext = plaintext
+        self.start_points = np.asarray(start_points, dtype=np.uint32)
+        self.end_points = np.asarray(end_points, dtype=np.uint32)
+        self.chain_length = chain_length  # rainbow: columns per chain, DP: maximum chain length
+        self.table_index = table_index
+        self.dp_bits = dp_bits
+        self.chain_lengths = chain_lengths
+        self.merged_chains = merged_chains  # chains dropped at build time because their endpoint was taken
+        self.rounds = rounds  # rounds of TC1_Enc used by the one-way function
+        self.key_bits = key_bits  # size of the key space covered by the chains
+
+    def __len__(self):
+        return len(self.start_points)
+
+    # Function returning, for an array of values, the index of the chain ending on each value (-1 if none)
+    def find_end_points(self, values):
+        values = np.asarray(values, dtype=np.uint32)
+        if len(self.end_points) == 0:
+            return np.full(values.shape, -1, dtype=np.int64)
+        index = np.minimum(np.searchsorted(self.end_points, values), len(self.end_points) - 1)
+        return np.where(self.end_points[index] == values, index, -1)
+
+    # Function returning the start point of the chain ending on `end_point`, or None
+    def find_start_point(self, end_point):
+        index = int(self.find_end_points(end_point))
+        return None if index < 0 else int(self.start_points[index])
+
+
+# Function to sort the chains by endpoint and keep a single chain per endpoint
+# Chains sharing an endpoint have merged: only one of them is worth storing. For DP tables the longest
+# one is kept, as it covers the most keys. Returns (start points, end points, lengths, merged count).
+def deduplicate_chains(start_points, end_points, chain_lengths=None):
+    if chain_lengths is None:
+        order = np.argsort(end_points, kind="stable")
+    else:
+        order = np.lexsort((-chain_lengths, end_points))
+    end_points = end_points[order]
+    keep = np.ones(len(end_points), dtype=bool)
+    keep[1:] = end_points[1:] != end_points[:-1]
+    order = order[keep]
+    lengths = None if chain_lengths is None else chain_lengths[order]
+    return start_points[order], end_points[keep], lengths, int(len(keep) - keep.sum())
+
+
+# Function to draw m random start points from a reproducible generator
+def random_start_points(m, seed=None, key_bits=32):
+    return np.random.default_rng(seed).integers(0, 2**key_bits, size=m, dtype=np.uint32)
+
+
+# Function computing the rainbow chains of a batch of start points: every chain is advanced
+# column by column, all chains at once. Returns (start points, end points, None).
+def rainbow_chains(plaintext, start_points, chain_length, table_index=0, rounds=10, key_bits=32):
+    keys = start_points
+    for column in range(chain_length):
+        keys = chain_step(plaintext, keys, column, table_index, rounds, key_bits)
+    return start_points, keys, None
+
+
+# Function computing the distinguished-point chains of a batch of start points: chains stop at their
+# first DP; chains with no DP after max_chain_length steps are dropped (probably stuck in a cycle).
+# Returns (start points, end points, chain lengths) of the chains kept.
+def dp_chains(plaintext, start_points, dp_bits, max_chain_length, table_index=0, rounds=10, key_bits=32):
+    dp_mask = np.uint32((1 << dp_bits) - 1)
+    keys = start_points.copy()
+    lengths = np.zeros(len(start_points), dtype=np.int64)
+    active = np.arange(len(start_points))
+    for step in range(1, max_chain_length + 1):
+        if active.size == 0:
+            break
+        keys[active] = chain_step(plaintext, keys[active], 0, table_index, rounds, key_bits)
+        distinguished = (keys[active] & dp_mask) == 0
+        lengths[active[distinguished]] = step
+        active = active[~distinguished]
+    keep = lengths > 0
+    return start_points[keep], keys[keep], lengths[keep]
+
+
+# Function building `count` chains from their own seed (also the work unit of the parallel builder)
+def build_chain_slice(kind, plaintext, count, seed, chain_length, table_index=0, dp_bits=0, rounds=10, key_bits=32):
+    start_points = random_start_points(count, seed, key_bits)
+    if kind == "rainbow":
+        return rainbow_chains(plaintext, start_points, chain_length, table_index, rounds, key_bits)
+    return dp_chains(plaintext, start_points, dp_bits, chain_length, table_index, rounds, key_bits)
+
+
+# Function turning raw chains into a deduplicated, sorted table (and saving it when a path is given)
+def finish_table(kind, plaintext, start_points, end_points, chain_lengths, chain_length, table_index, dp_bits,
+                 rounds, key_bits, path):
+    start_points, end_points, chain_lengths, merged = deduplicate_chains(start_points, end_points, chain_lengths)
+    table = TMTOTable(kind, plaintext, start_points, end_points, chain_length, table_index, dp_bits,
+                      chain_lengths, merged, rounds, key_bits)
+    if path is not None:
+        save_table(table, path)
+    return table
+
+
+# Offline phase (rainbow)
+def build_rainbow_table(plaintext, m, chain_length, table_index=0, seed=None, rounds=10, path=None, key_bits=32):
+    plaintext = pack_state(plaintext)
+    chains = build_chain_slice("rainbow", plaintext, m, seed, chain_length, table_index, 0, rounds, key_bits)
+    return finish_table("rainbow", plaintext, *chains, chain_length, table_index, 0, rounds, key_bits, path)
+
+
+# Offline phase (distinguished points)
+def build_dp_table(plaintext, m, dp_bits, max_chain_length, table_index=0, seed=None, rounds=10, path=None,
+                   key_bits=32):
+    plaintext = pack_state(plaintext)
+    chains = build_chain_slice("dp", plaintext, m, seed, max_chain_length, table_index, dp_bits, rounds, key_bits)
+    return finish_table("dp", plaintext, *chains, max_chain_length, table_index, dp_bits, rounds, key_bits, path)
+
+
+# Number of chains per work unit of the parallel builder
+DEFAULT_SLICE_SIZE = 2**14
+
+
+# Offline phase on a process pool: the m chains are cut into slices of slice_size chains, slice i draws its
+# start points from the i-th child of SeedSequence(seed), and the slices are merged into one deduplicated,
+# sorted table. For a given (seed, m, slice_size) the table is the same whatever the number of workers.
+def build_table_parallel(kind, plaintext, m, chain_length, dp_bits=0, table_index=0, seed=None, rounds=10,
+                         workers=None, slice_size=DEFAULT_SLICE_SIZE, path=None, key_bits=32):
+    if kind not in TABLE_KINDS:
+        raise ValueError(f"Unknown table kind {kind!r}, expected one of {TABLE_KINDS}.")
+    plaintext = pack_state(plaintext)
+    counts = [min(slice_size, m - start) for start in range(0, m, slice_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    with ProcessPoolExecutor(workers) as pool:
+        slices = list(pool.map(build_chain_slice, [kind] * len(counts), [plaintext] * len(counts), counts, seeds,
+                               [chain_length] * len(counts), [table_index] * len(counts),
+                               [dp_bits] * len(counts), [rounds] * len(counts), [key_bits] * len(counts)))
+    start_points = np.concatenate([chains[0] for chains in slices]) if slices else np.zeros(0, dtype=np.uint32)
+    end_points = np.concatenate([chains[1] for chains in slices]) if slices else np.zeros(0, dtype=np.uint32)
+    chain_lengths = None
+    if kind == "dp":
+        chain_lengths = np.concatenate([chains[2] for chains in slices]) if slices else np.zeros(0, dtype=np.int64)
+    return finish_table(kind, plaintext, start_points, end_points, chain_lengths, chain_length, table_index,
+                        dp_bits, rounds, key_bits, path)
+
+
+# Function to walk a chain again from its start point and look for a key encrypting P to C
+# Rainbow: the key can only be in `column`; DP: it can be anywhere before the endpoint.
+def regenerate_chain(table, start_point, ciphertext, column=None):
+    key = int(start_point)
+    constant = reduction_constant(0, table.table_index)
+    key_mask = (1 << table.key_bits) - 1
+    if table.kind == "rainbow":
+        for i in range(column):
+            key = (TC1_Enc_packed(table.plaintext, key, table.rounds) ^ reduction_constant(i, table.table_index)) & key_mask
+        encryptions = column + 1
+        return (key if TC1_Enc_packed(table.plaintext, key, table.rounds) == ciphertext else None), encryptions
+    dp_mask = (1 << table.dp_bits) - 1
+    for encryptions in range(1, table.chain_length + 1):
+        encrypted = TC1_Enc_packed(table.plaintext, key, table.rounds)
+        if encrypted == ciphertext:
+            return key, encryptions
+        key = (encrypted ^ constant) & key_mask
+        # The chain ends at its first distinguished point
+        if key & dp_mask == 0:
+            return None, encryptions
+    return None, table.chain_length
+
+
+# Online phase (rainbow): for every possible column j, walk R_j(C) to the end of the chain
+# (all columns are advanced together as one array) and look the result up among the endpoints
+def rainbow_lookup(table, ciphertext, stats):
+    t = table.chain_length
+    key_mask = (1 << table.key_bits) - 1
+    columns = np.arange(t)
+    candidates = np.array([(ciphertext ^ reduction_constant(j, table.table_index)) & key_mask for j in range(t)],
+                          dtype=np.uint32)
+    for column in range(1, t):
+        moving = columns < column
+        candidates[moving] = chain_step(table.plaintext, candidates[moving], column, table.table_index, table.rounds,
+                                        table.key_bits)
+        stats["encryptions"] += int(moving.sum())
+    # All t candidate endpoints are looked up at once; regenerating a chain up to column j costs
+    # j + 1 encryptions, so the matches are tried from the lowest column (cheapest false alarm) up
+    matches = table.find_end_points(candidates)
+    for j in np.flatnonzero(matches >= 0):
+        key, encryptions = regenerate_chain(table, table.start_points[matches[j]], ciphertext, int(j))
+        stats["encryptions"] += encryptions
+        if key is not None:
+            return key
+        stats["false_alarms"] += 1
+    return None
+
+
+# Online phase (DP): walk from R(C) until a distinguished point, then regenerate the matching chains
+def dp_lookup(table, ciphertext, stats):
+    dp_mask = (1 << table.dp_bits) - 1
+    constant = reduction_constant(0, table.table_index)
+    key_mask = (1 << table.key_bits) - 1
+    key = (ciphertext ^ constant) & key_mask
+    for _ in range(table.chain_length):
+        if key & dp_mask == 0:
+            break
+        key = (TC1_Enc_packed(table.plaintext, key, table.rounds) ^ constant) & key_mask
+        stats["encryptions"] += 1
+    else:
+        return None
+    start_point = table.find_start_point(key)
+    if start_point is None:
+        return None
+    found, encryptions = regenerate_chain(table, start_point, ciphertext)
+    stats["encryptions"] += encryptions
+    if found is None:
+        stats["false_alarms"] += 1
+    return found
+
+
+# Function to search a list of tables for a key that encrypts the table plaintext P to `ciphertext`
+# Returns (key as a list of 4 bytes or None, stats with the encryptions spent and the false alarms met)
+def tmto_search(tables, ciphertext):
+    ciphertext = pack_state(ciphertext) if isinstance(ciphertext, (list, tuple)) else ciphertext
+    stats = {"encryptions": 0, "false_alarms": 0}
+    for table in tables:
+        lookup = rainbow_lookup if table.kind == "rainbow" else dp_lookup
+        key = lookup(table, ciphertext, stats)
+        if key is not None:
+            return unpack_state(key), stats
+    return None, stats
+
+
+# Function to measure the tables on random keys: coverage (success rate), false alarms and online cost
+def evaluate_tables(tables, samples=100, seed=None):
+    plaintext, rounds = tables[0].plaintext, tables[0].rounds
+    # Draw the test keys from their own stream, so the same seed as a table never replays its start points
+    keys = np.random.default_rng(None if seed is None else [seed, samples]).integers(
+        0, 2**tables[0].key_bits, size=samples, dtype=np.uint32)
+    successes = false_alarms = encryptions = 0
+    for key in keys:
+        ciphertext = TC1_Enc_packed(plaintext, int(key), rounds)
+        found, stats = tmto_search(tables, ciphertext)
+        successes += found is not None and TC1_Enc_packed(plaintext, pack_state(found), rounds) == ciphertext
+        false_alarms += stats["false_alarms"]
+        encryptions += stats["encryptions"]
+    return {
+        "chains": sum(len(table) for table in tables),
+        "merged_chains": sum(table.merged_chains for table in tables),
+        "coverage": successes / samples,
+        "false_alarms_per_search": false_alarms / samples,
+        "encryptions_per_search": encryptions / samples,
+    }
+
+
+# On-disk table format (little-endian), so an expensive offline phase is kept and reopened with np.memmap:
+#   header (64 bytes): magic, format version, table kind, reduction scheme, cipher block / key bits,
+#                      cipher rounds, plaintext P, chain length, table index, DP bits, chain count m,
+#                      merged chain count, whether chain lengths are stored
+#   start points: m x uint32, end points (sorted): m x uint32, [chain lengths: m x uint32, DP tables only]
+TABLE_MAGIC = b"TC1TMTO\0"
+TABLE_VERSION = 1
+TABLE_HEADER = struct.Struct("<8sIBBBBIIIIIQQB")
+TABLE_HEADER_SIZE = 64
+TABLE_KINDS = ("rainbow", "dp")
+# Reduction scheme 0: x ^ reduction_constant(column, table index) (the only one so far)
+REDUCTION_XOR_CONSTANT = 0
+
+
+# Function to write a table to `path` in the binary format above
+def save_table(table, path):
+    has_lengths = table.chain_lengths is not None
+    header = TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, TABLE_KINDS.index(table.kind), REDUCTION_XOR_CONSTANT,
+                               32, table.key_bits, table.rounds, table.plaintext, table.chain_length, table.table_index,
+                               table.dp_bits, len(table), table.merged_chains, has_lengths)
+    with open(path, "wb") as handle:
+        handle.write(header.ljust(TABLE_HEADER_SIZE, b"\0"))
+        handle.write(np.asarray(table.start_points, dtype="<u4").tobytes())
+        handle.write(np.asarray(table.end_points, dtype="<u4").tobytes())
+        if has_lengths:
+            handle.write(np.asarray(table.chain_lengths, dtype="<u4").tobytes())
+
+
+# Function to reopen a saved table; the point arrays are read-only memory maps, so loading is
+# almost instant, only the pages touched by lookups are read, and processes share them through the page cache
+def load_table(path):
+    with open(path, "rb") as handle:
+        raw = handle.read(TABLE_HEADER_SIZE)
+    if len(raw) < TABLE_HEADER_SIZE:
+        raise ValueError(f"{path} is not a TMTO table file.")
+    (magic, version, kind, reduction, block_bits, key_bits, rounds, plaintext, chain_length, table_index,
+     dp_bits, m, merged, has_lengths) = TABLE_HEADER.unpack_from(raw)
+    if magic != TABLE_MAGIC:
+        raise ValueError(f"{path} is not a TMTO table file.")
+    if version != TABLE_VERSION or reduction != REDUCTION_XOR_CONSTANT or block_bits != 32 or not 1 <= key_bits <= 32:
+        raise ValueError(f"{path} uses an unsupported table format or cipher.")
+
+    def points(index):
+        if m == 0:
+            return np.zeros(0, dtype=np.uint32)
+        return np.memmap(path, dtype="<u4", mode="r", offset=TABLE_HEADER_SIZE + 4 * m * index, shape=(m,))
+
+    return TMTOTable(TABLE_KINDS[kind], plaintext, points(0), points(1), chain_length, table_index, dp_bits,
+                     points(2) if has_lengths else None, merged, rounds, key_bits)
+
+
+# Function to reopen several saved tables at once
+def load_tables(paths):
+    return [load_table(path) for path in paths]
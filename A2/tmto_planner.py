@@ -0,0 +1,141 @@
+import math
+
+import numpy as np
+
+from tmto import build_rainbow_table, build_dp_table, evaluate_tables
+
+# TMTO parameter planner for the Toy Cipher.
+# Given a target success probability, a memory budget and an online-time budget, it picks the kind of
+# table (rainbow or distinguished points), the number of chains m, the chain length t and the number
+# of tables, using the standard coverage estimates:
+#   - rainbow (Oechslin): m_1 = m, m_(i+1) = N (1 - exp(-m_i / N)); one table succeeds with probability
+#     1 - prod_(i=1..t) (1 - m_i / N) and keeps m_(t+1) distinct endpoints
+#   - Hellman (used for DP tables with mean chain length t): one table covers
+#     (1 / N) sum_(i<m) sum_(j<t) (1 - i t / N)^(j+1) of the key space
+# With l independent tables the success probability is 1 - (1 - p)^l.
+
+BYTES_PER_CHAIN = 8  # uint32 start point + uint32 end point
+BYTES_PER_DP_CHAIN = 12  # DP tables also store the chain length
+
+TABLE_COUNTS = (1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 48, 64)
+
+# Number of m values tried per doubling of m
+M_STEPS_PER_OCTAVE = 8
+
+
+# Function giving, for every m in `ms`, the success probability of one rainbow table with t columns
+# and the number of distinct endpoints it keeps
+def rainbow_success(ms, t, n):
+    chains = np.asarray(ms, dtype=np.float64)
+    log_miss = np.zeros_like(chains)
+    for _ in range(t):
+        log_miss += np.log1p(-np.minimum(chains / n, 1.0 - 1e-16))
+        chains = n * -np.expm1(-chains / n)
+    return -np.expm1(log_miss), chains
+
+
+# Function giving, for every m in `ms`, the coverage of one Hellman / DP table with chains of length t
+def hellman_success(ms, t, n, grid_points=4096):
+    ms = np.asarray(ms, dtype=np.float64)
+    # The inner sum over j for chain i is a geometric series in a = 1 - i t / N
+    i = np.linspace(0.0, ms.max(), grid_points)
+    a = np.clip(1.0 - i * t / n, 0.0, 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_chain = np.where(a < 1.0, a * (1.0 - a**t) / (1.0 - a), float(t))
+    # Integrate over the chains with the trapezoid rule, then read the integral at every m
+    cumulative = np.concatenate(([0.0], np.cumsum((per_chain[1:] + per_chain[:-1]) / 2 * np.diff(i))))
+    return np.minimum(np.interp(ms, i, cumulative) / n, 1.0)
+
+
+# Function to bound the online cost (encryptions per search, false alarms aside) of `tables` tables with
+# chains of length t: rainbow tables walk every column from R_j(C) to the end; DP tables walk to a DP
+# and regenerate one chain. A search that finds the key early stops before the bound.
+def online_cost(kind, t, tables):
+    if kind == "rainbow":
+        return tables * t * (t + 1) // 2
+    return tables * 2 * t
+
+
+# Function listing, for every kind, chain length and table count, the cheapest m that reaches the target
+# success probability within the memory and online budgets (one row per combination tried)
+def parameter_sweep(target_success, memory_bytes, online_encryptions, key_bits=32, kinds=("rainbow", "dp"),
+                    table_counts=TABLE_COUNTS):
+    n = float(2**key_bits)
+    rows = []
+    for kind in kinds:
+        bytes_per_chain = BYTES_PER_CHAIN if kind == "rainbow" else BYTES_PER_DP_CHAIN
+        for log_t in range(1, key_bits // 2 + 5):
+            t = 2**log_t
+            if online_cost(kind, t, 1) > online_encryptions:
+                break
+            # Candidate m values: a geometric grid up to what the whole memory budget could hold
+            m_max = max(2, min(memory_bytes // bytes_per_chain, int(4 * n)))
+            ms = np.unique(np.round(np.exp2(np.arange(0, math.log2(m_max) + 1e-9, 1.0 / M_STEPS_PER_OCTAVE))))
+            if kind == "rainbow":
+                single, stored = rainbow_success(ms, t, n)
+            else:
+                single, stored = hellman_success(ms, t, n), ms
+            for tables in table_counts:
+                if online_cost(kind, t, tables) > online_encryptions:
+                    break
+                success = 1.0 - (1.0 - single) ** tables
+                memory = tables * stored * bytes_per_chain
+                fits = (success >= target_success) & (memory <= memory_bytes)
+                if not fits.any():
+                    continue
+                best = int(np.flatnonzero(fits)[0])
+                rows.append({
+                    "kind": kind,
+                    "m": int(ms[best]),
+                    "t": t,
+                    "dp_bits": log_t if kind == "dp" else 0,
+                    "tables": tables,
+                    "success": float(success[best]),
+                    "memory_bytes": int(memory[best]),
+                    "online_encryptions": online_cost(kind, t, tables),
+                    "offline_encryptions": int(ms[best]) * t * tables,
+                })
+    return rows
+
+
+# Function choosing the plan with the cheapest precomputation (then the cheapest online phase)
+# among those meeting every budget; returns None when no plan fits
+def plan_tmto(target_success, memory_bytes, online_encryptions, key_bits=32, kinds=("rainbow", "dp")):
+    rows = parameter_sweep(target_success, memory_bytes, online_encryptions, key_bits, kinds)
+    if not rows:
+        return None
+    return min(rows, key=lambda row: (row["offline_encryptions"], row["online_encryptions"]))
+
+
+# Function to build the tables of a plan (on a small key space and a reduced-round cipher, so it runs
+# quickly) and compare the predicted success with the measured one
+def check_plan(plan, plaintext, key_bits, rounds=4, samples=200, seed=0):
+    if plan["kind"] == "rainbow":
+        tables = [build_rainbow_table(plaintext, plan["m"], plan["t"], table_index=i, seed=[seed, i],
+                                      rounds=rounds, key_bits=key_bits) for i in range(plan["tables"])]
+    else:
+        tables = [build_dp_table(plaintext, plan["m"], plan["dp_bits"], 8 * plan["t"], table_index=i,
+                                 seed=[seed, i], rounds=rounds, key_bits=key_bits) for i in range(plan["tables"])]
+    measured = evaluate_tables(tables, samples, seed)
+    return {
+        "predicted_success": plan["success"],
+        "measured_success": measured["coverage"],
+        "predicted_online_encryptions": plan["online_encryptions"],
+        "measured_online_encryptions": measured["encryptions_per_search"],
+        "false_alarms_per_search": measured["false_alarms_per_search"],
+        "stored_chains": measured["chains"],
+    }
+
+
+if __name__ == "__main__":
+    # Plan for the full 32-bit key space: 90% success, 256 MiB of tables, 2^24 encryptions per search
+    plan = plan_tmto(0.9, 256 * 2**20, 2**24)
+    print("Plan for the full key space:")
+    print(plan)
+
+    # Check the estimates on a 16-bit key space with a 4-round cipher
+    print("\nEstimated vs measured on a 16-bit key space (4 rounds):")
+    for kind in ("rainbow", "dp"):
+        small_plan = plan_tmto(0.8, 64 * 2**10, 2**14, key_bits=16, kinds=(kind,))
+        print(small_plan)
+        print(check_plan(small_plan, [0x12, 0x34, 0x56, 0x78], key_bits=16))
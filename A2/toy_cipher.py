@@ -20,6 +20,11 @@ Sbox = [
     0x8c, 0xa1, 0x89, 0x0d, 0xbf, 0xe6, 0x42, 0x68, 0x41, 0x99, 0x2d, 0x0f, 0xb0, 0x54, 0xbb, 0x16
 ]
 
+# Inverse S-BOX (Inv_Sbox[Sbox[x]] = x)
+Inv_Sbox = [0] * 256
+for x in range(256):
+    Inv_Sbox[Sbox[x]] = x
+
 # Function to add Round Key
 def AR(state, key):
     return [state[i] ^ key[i] for i in range(len(state))]
@@ -41,6 +46,41 @@ def Enc_Round(state, key):
     return state_out
 
 
+# Decryption: inverse layers applied in reverse order
+
+# Function for the inverse S-box Layer
+def ISB(state):
+    return [Inv_Sbox[i] for i in state]
+
+# Function to check that LM is its own inverse
+# LM is linear over GF(2), so applying it twice to the 32 unit vectors is enough. Why it holds: with X the
+# XOR of all bytes of state, byte i of LM(state) is X ^ state[i], so the XOR of all bytes of LM(state) is
+# 4 copies of X (which cancel) plus X, i.e. X again. The even number of bytes preserves X, and applying LM
+# again gives X ^ X ^ state[i] = state[i]. (With an odd number of bytes that XOR would be 0 for every state,
+# so LM would not even be invertible.)
+def LM_is_involution():
+    for bit in range(32):
+        state = [0, 0, 0, 0]
+        state[bit // 8] = 1 << (bit % 8)
+        if LM(LM(state)) != state:
+            return False
+    return True
+
+if not LM_is_involution():
+    raise RuntimeError("LM is not its own inverse, the decryption below would be wrong.")
+
+# Function for the inverse of Linear Mixing (LM is its own inverse, checked above)
+def LM_inv(state):
+    return LM(state)
+
+# Function for Single Decryption Round (inverse of Enc_Round)
+def Dec_Round(state, key):
+    state_out = LM_inv(state)
+    state_out = ISB(state_out)
+    state_out = AR(state_out, key)
+    return state_out
+
+
 # Part-1 : Implementaion of the Toy Cipher
 
 # Function for the encrption of the Toy Cipher
@@ -51,65 +91,127 @@ def TC1_Enc(Plaintext, key, rounds=10):
     return Cipher
 
 
+# Function for the decryption of the Toy Cipher (inverse of TC1_Enc)
+def TC1_Dec(Ciphertext, key, rounds=10):
+    Plain = Ciphertext
+    for _ in range(rounds):
+        Plain = Dec_Round(Plain, key)
+    return Plain
+
+
+# Packed-state engine: the 32-bit state is a single int (byte 0 of the list is the most significant byte)
+
+# Function to pack a list of 4 bytes into a 32-bit int
+def pack_state(state):
+    return (state[0] << 24) | (state[1] << 16) | (state[2] << 8) | state[3]
+
+# Function to unpack a 32-bit int back into a list of 4 bytes
+def unpack_state(value):
+    return [(value >> 24) & 0xFF, (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF]
+
+# Function to build the combined SB + LM tables
+# Output byte i of LM is the XOR of the three other S-box outputs, so byte position j
+# contributes Sbox[x_j] to every output byte except byte j: Round_Tables[j][x_j] holds that word.
+def build_round_tables():
+    tables = []
+    for j in range(4):
+        keep = 0xFFFFFFFF ^ (0xFF << (8 * (3 - j)))
+        tables.append(tuple((Sbox[x] * 0x01010101) & keep for x in range(256)))
+    return tables
+
+T0, T1, T2, T3 = build_round_tables()
+
+# Function for the encryption of the Toy Cipher on packed ints (same result as TC1_Enc)
+def TC1_Enc_packed(plaintext, key, rounds=10):
+    state = plaintext
+    for _ in range(rounds):
+        state ^= key
+        state = T0[state >> 24] ^ T1[(state >> 16) & 0xFF] ^ T2[(state >> 8) & 0xFF] ^ T3[state & 0xFF]
+    return state
+
+# Function with the same interface as TC1_Enc (lists of 4 bytes) running on the packed engine
+def TC1_Enc_fast(Plaintext, key, rounds=10):
+    return unpack_state(TC1_Enc_packed(pack_state(Plaintext), pack_state(key), rounds))
+
+# Function for the decryption of the Toy Cipher on packed ints
+# LM XORs the XOR of the four bytes into every byte; that XOR is folded into the low byte with two shifts.
+def TC1_Dec_packed(ciphertext, key, rounds=10):
+    state = ciphertext
+    for _ in range(rounds):
+        folded = state ^ (state >> 16)
+        folded ^= folded >> 8
+        state ^= (folded & 0xFF) * 0x01010101
+        state = ((Inv_Sbox[state >> 24] << 24) | (Inv_Sbox[(state >> 16) & 0xFF] << 16)
+                 | (Inv_Sbox[(state >> 8) & 0xFF] << 8) | Inv_Sbox[state & 0xFF])
+        state ^= key
+    return state
+
+
 
 # Part-2 : Exhaustively Searchig for the key
 
 # Function that will take the input as plaintext and ciphertext and output the exhaustive key using brute force 
 
 def exhaustive_search(plaintexts, ciphertexts):
+    # Pack the pairs once so every candidate only runs the packed-state engine
+    packed_pairs = [(pack_state(p), pack_state(c)) for p, c in zip(plaintexts, ciphertexts)]
+
     # To reduce the complexity: Fixing  the first byte of the exhaustive key key to 0x00 [0x00 , ? , ? , ?]
-    for byte1 in range(256):
-        for byte2 in range(256):
-            for byte3 in range(256):
-                # Construct a candidate key
-                candidate_key = [0x00, byte1, byte2, byte3]
-
-                #  Condition to check this key works for all plaintext-ciphertext pairs 
-                is_key_valid = True
-                for plaintext, ciphertext in zip(plaintexts, ciphertexts):
-                    if TC1_Enc(plaintext, candidate_key) != ciphertext:
-                        #Check if key found or not
-                        is_key_valid = False
-                        break
-
-                # If a valid key is found, return it
-                if is_key_valid:
-                    return candidate_key
+    # The candidate int 0x00XXYYZZ walks the keys in the same order as three nested loops over the bytes
+    for candidate_key in range(2**24):
+
+        #  Condition to check this key works for all plaintext-ciphertext pairs 
+        is_key_valid = True
+        for plaintext, ciphertext in packed_pairs:
+            if TC1_Enc_packed(plaintext, candidate_key) != ciphertext:
+                #Check if key found or not
+                is_key_valid = False
+                break
+
+        # If a valid key is found, return it
+        if is_key_valid:
+            return unpack_state(candidate_key)
 
     # If no key has been found we return None
     return None
 
 
 # Function to generate 32-bit random string for Part-3 
-def random_32_bit():
-    return [random.randint(0, 255) for b in range(4)]
+# (rng can be a seeded random.Random instance; the global random module is used by default)
+def random_32_bit(rng=random):
+    return [rng.randint(0, 255) for b in range(4)]
 
 # Part-3 : TMTO Attack for key recovery
 
 # Function to make the preprocess table in the TMTO attack (Offine Phase) 
-def Offline_phase(m, chain_length):
+# With a seed, the start points come from a private random.Random(seed), so the table can be reproduced
+def Offline_phase(m, chain_length, seed=None):
 
     # This Table will store Starting point and Ending point of chains as a single tuple
     # eg -> table = [(sp1,ep1), {sp2,ep2}...... {spn, epn}]
-    table = []
+    # Chains are indexed by their packed endpoint: a chain ending on an endpoint already present
+    # has merged into an earlier chain and is dropped
+    chains = {}
+    rng = random if seed is None else random.Random(seed)
 
     for _ in range(m):
-        sp = random_32_bit()
-        tmp = sp.copy()
+        sp = random_32_bit(rng)
+        tmp = pack_state(sp)
         for _ in range(chain_length - 1):
-            tmp = TC1_Enc(tmp, tmp) 
-        ep = tmp
-        table.append((sp, ep))
-    return table
+            tmp = TC1_Enc_packed(tmp, tmp) 
+        if tmp not in chains:
+            chains[tmp] = (sp, unpack_state(tmp))
+    return list(chains.values())
 # Function to search the table (precomputed table of the TMTO attack) -- (Online Phase)
 def Online_phase(table, plaintext, ciphertext, chain_length):
 
+    plaintext, ciphertext = pack_state(plaintext), pack_state(ciphertext)
     for sp, ep in table:
-        tmp = sp.copy()
+        tmp = pack_state(sp)
         for i in range(chain_length):
-            if TC1_Enc(plaintext, tmp) == ciphertext:
-                return tmp
-            tmp = TC1_Enc(tmp, tmp)
+            if TC1_Enc_packed(plaintext, tmp) == ciphertext:
+                return unpack_state(tmp)
+            tmp = TC1_Enc_packed(tmp, tmp)
     return None
 
 
@@ -0,0 +1,75 @@
+"""
+fast_cipher.py - Table-Driven Toy Cipher
+------------------------------------------
+
+The block is only 16 bits, so every layer of the cipher is a 65536-entry lookup table:
+S_LAYER applies the S-box to the four nibbles, P_LAYER applies the bit permutation, and
+ROUND_LAYER = P_LAYER[S_LAYER] is a whole middle round (after the key mixing).
+The tables are NumPy arrays, so whole arrays of plaintexts are encrypted at once.
+"""
+
+import numpy as np
+
+from part1 import S_BOX, P_BOX
+
+BLOCK_VALUES = 2**16
+
+def build_s_layer(s_box=S_BOX):
+    """Build the table applying the S-box to every nibble of a 16-bit value."""
+    values = np.arange(BLOCK_VALUES, dtype=np.uint16)
+    s_box = np.array(s_box, dtype=np.uint16)
+    layer = np.zeros(BLOCK_VALUES, dtype=np.uint16)
+    for shift in (0, 4, 8, 12):
+        layer |= s_box[(values >> shift) & 0xF] << shift
+    return layer
+
+def build_p_layer(p_box=P_BOX):
+    """
+    Build the table applying the bit permutation to every 16-bit value.
+    Bit i (MSB first) moves to position p_box[i], as in part1.permute.
+    """
+    values = np.arange(BLOCK_VALUES, dtype=np.uint16)
+    layer = np.zeros(BLOCK_VALUES, dtype=np.uint16)
+    for i, position in enumerate(p_box):
+        layer |= ((values >> (15 - i)) & 1) << (15 - position)
+    return layer
+
+S_LAYER = build_s_layer()
+P_LAYER = build_p_layer()
+ROUND_LAYER = P_LAYER[S_LAYER]
+
+# Plain lists for the single-block path (indexing a list with an int is faster than a NumPy array)
+S_LAYER_LIST = S_LAYER.tolist()
+ROUND_LAYER_LIST = ROUND_LAYER.tolist()
+
+def encrypt_fast(plaintext, keys):
+    """Encrypt one 16-bit plaintext with the lookup tables (same result as part1.encrypt)."""
+    state = plaintext
+    for round_index in range(4):
+        state = ROUND_LAYER_LIST[state ^ keys[round_index]]
+    return S_LAYER_LIST[state ^ keys[4]] ^ keys[5]
+
+def encrypt_batch(plaintexts, keys):
+    """
+    Encrypt a NumPy array of 16-bit plaintexts at once.
+    Every round key may be an int or an array broadcast against the plaintexts, so the same call
+    also tries many candidate keys (e.g. every value of the last round key) on one plaintext.
+    """
+    state = np.asarray(plaintexts, dtype=np.uint16)
+    keys = [np.asarray(key, dtype=np.uint16) for key in keys]
+    for round_index in range(4):
+        state = ROUND_LAYER[state ^ keys[round_index]]
+    return S_LAYER[state ^ keys[4]] ^ keys[5]
+
+def full_codebook(keys):
+    """Return the 65536 ciphertexts of the key schedule, indexed by plaintext."""
+    return encrypt_batch(np.arange(BLOCK_VALUES, dtype=np.uint16), keys)
+
+if __name__ == "__main__":
+    from part1 import encrypt, generate_keys
+
+    round_keys = generate_keys()
+    codebook = full_codebook(round_keys)
+    print(f"Codebook size: {codebook.size} entries ({codebook.nbytes} bytes)")
+    print(f"Codebook is a permutation: {np.unique(codebook).size == BLOCK_VALUES}")
+    print(f"Matches part1.encrypt: {all(encrypt(p, round_keys) == codebook[p] for p in range(0, BLOCK_VALUES, 97))}")
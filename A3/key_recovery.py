@@ -0,0 +1,199 @@
+"""
+key_recovery.py - Full Key Schedule Recovery with Multiple Differentials
+--------------------------------------------------------------------------
+
+Round r (r = 0..3): state = P(S(state ^ K_r)); then C = S(state ^ K4) ^ K5.
+Once K5 is known, z = P^-1(S^-1(C ^ K5)) = S(u ^ K3) ^ P^-1(K4), where u is the state after three
+rounds: the peeled cipher has the same shape (SP rounds, one S-layer, a final key) with one round fewer.
+The attack therefore works level by level:
+  1. pick the best differentials of the remaining SP rounds from the trail search (part3), enough to
+     cover every nibble of the current last key,
+  2. for each one, ask the encryption oracle for chosen-plaintext pairs and count the candidates of
+     its active nibbles (part4's vectorized engine),
+  3. merge the counters nibble by nibble (z-scores of the counters, maximized over the other
+     nibbles of the same differential, then summed) and rank full candidates for the last key,
+  4. peel the round off and recurse.
+With no SP round left, z = S(P ^ K0) ^ K1' is solved exactly from 16 chosen plaintexts that take
+every value on every nibble, so each nibble has a single (k0, k1) (the S-box has no linear structure).
+A small beam of last-key candidates per level is kept, and every full schedule is checked against a
+separate set of known plaintext-ciphertext pairs, so a wrong guess is backtracked instead of accepted.
+If several schedules pass the check, none is returned: all of them are reported instead.
+"""
+
+import itertools
+import math
+
+import numpy as np
+
+from part1 import S_BOX, S_INV
+from part3 import search_best_trails
+from part4 import count_last_round_keys, resolve_active_nibbles
+from fast_cipher import encrypt_batch, S_LAYER, P_LAYER
+
+INVERSE_S_LAYER = np.argsort(S_LAYER).astype(np.uint16)
+INVERSE_P_LAYER = np.argsort(P_LAYER).astype(np.uint16)
+
+# Pairs asked per differential: PAIR_FACTOR / probability (about PAIR_FACTOR right pairs)
+PAIR_FACTOR = 24
+
+# Plaintexts used to solve K0 and K1': plaintext v has every nibble equal to v
+SOLVE_PLAINTEXTS = np.arange(16, dtype=np.uint16) * np.uint16(0x1111)
+
+# Known plaintext-ciphertext pairs used to check a full key schedule (never used to solve it)
+CHECK_PAIRS = 16
+
+class EncryptionOracle:
+    """Chosen-plaintext access to the cipher under a secret key schedule, counting the encryptions."""
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.encryptions = 0
+
+    def __call__(self, plaintexts):
+        plaintexts = np.asarray(plaintexts, dtype=np.uint16)
+        self.encryptions += plaintexts.size
+        return encrypt_batch(plaintexts, self.keys)
+
+def peel_round(values, last_key):
+    """Undo the final key and S-layer, then the P-layer: z_(r-1) = P^-1(S^-1(z_r ^ K'))."""
+    return INVERSE_P_LAYER[INVERSE_S_LAYER[np.asarray(values, dtype=np.uint16) ^ np.uint16(last_key)]]
+
+def peel(values, peeled_keys):
+    """Peel off every round whose (transformed) last key is known, last round first."""
+    for last_key in peeled_keys:
+        values = peel_round(values, last_key)
+    return values
+
+def select_differentials(rounds, per_nibble=2, candidates=300, extra_weight=3.0):
+    """
+    Pick differentials (probability, input difference, output difference) over `rounds` SP rounds so that
+    every nibble of the last key is active in at least per_nibble of them, most probable first.
+    """
+    _, differentials, _ = search_best_trails(rounds, top=candidates, extra_weight=extra_weight)
+    coverage = [0] * 4
+    selected = []
+    for probability, delta_in, delta_out, _ in differentials:
+        active = resolve_active_nibbles(delta_out)
+        if any(coverage[i] < per_nibble for i in active):
+            selected.append((probability, delta_in, delta_out))
+            for i in active:
+                coverage[i] += 1
+        if min(coverage) >= per_nibble:
+            break
+    if min(coverage) == 0:
+        raise ValueError("The differentials found do not cover every nibble of the last key.")
+    return selected
+
+def nibble_scores(counts, active_nibbles):
+    """
+    Turn the counters of one differential into a (4, 16) array of per-nibble scores: the z-score of
+    the best candidate having that value on that nibble (0 for the nibbles it does not cover).
+    """
+    scores = np.zeros((4, 16))
+    spread = counts.std()
+    if spread == 0:
+        return scores
+    z = ((counts - counts.mean()) / spread).reshape((16,) * len(active_nibbles))
+    for axis, nibble_index in enumerate(active_nibbles):
+        others = tuple(a for a in range(len(active_nibbles)) if a != axis)
+        scores[nibble_index] = z.max(axis=others) if others else z
+    return scores
+
+def rank_last_keys(scores, beam, per_nibble=3):
+    """The `beam` best full last-key candidates, combining the per_nibble best values of every nibble."""
+    choices = [np.argsort(-scores[i], kind="stable")[:per_nibble] for i in range(4)]
+    combos = []
+    for values in itertools.product(*choices):
+        total = sum(scores[i][v] for i, v in enumerate(values))
+        key = (int(values[0]) << 12) | (int(values[1]) << 8) | (int(values[2]) << 4) | int(values[3])
+        combos.append((-total, key))
+    return [key for _, key in sorted(combos)[:beam]]
+
+def recover_level(oracle, rounds, peeled_keys, rng, pair_factor=PAIR_FACTOR, beam=3):
+    """
+    Rank candidates for the last key of the cipher peeled down to `rounds` SP rounds.
+    Returns up to `beam` candidates, best first.
+    """
+    scores = np.zeros((4, 16))
+    for probability, delta_in, delta_out in select_differentials(rounds):
+        num_pairs = math.ceil(pair_factor / probability)
+        pts = rng.integers(0, 2**16, num_pairs, dtype=np.uint16)
+        zs = peel(oracle(pts), peeled_keys)
+        z_variants = peel(oracle(pts ^ np.uint16(delta_in)), peeled_keys)
+        active = resolve_active_nibbles(delta_out)
+        _, counts = count_last_round_keys(zs, z_variants, delta_out, active, top=1)
+        scores += nibble_scores(counts, active)
+    return rank_last_keys(scores, beam)
+
+def solve_first_round(pts, zs):
+    """
+    Solve z = S(P ^ K0) ^ K1' exactly from known pairs: for every nibble, keep the (k0, k1) values
+    consistent with all pairs. Returns every full (K0, K1') solution; the solution is unique when the
+    pairs cover all 16 values of every nibble.
+    """
+    per_nibble = []
+    for nibble_index in range(4):
+        shift = 4 * (3 - nibble_index)
+        solutions = []
+        for k1 in range(16):
+            # The first pair fixes k0; the others must agree with it
+            k0 = S_INV[((int(zs[0]) >> shift) & 0xF) ^ k1] ^ ((int(pts[0]) >> shift) & 0xF)
+            if all(S_BOX[((int(p) >> shift) & 0xF) ^ k0] ^ k1 == (int(z) >> shift) & 0xF for p, z in zip(pts, zs)):
+                solutions.append((k0 << shift, k1 << shift))
+        per_nibble.append(solutions)
+    return [(sum(k0 for k0, _ in combo), sum(k1 for _, k1 in combo)) for combo in itertools.product(*per_nibble)]
+
+def transformed_to_schedule(k0, transformed_keys):
+    """
+    Turn K0 and the transformed last keys [K5, K4', K3', K2', K1'] (K' = P^-1(K)) into [K0, ..., K5].
+    """
+    keys = [int(P_LAYER[key]) for key in transformed_keys[1:]]
+    return [k0] + keys[::-1] + [transformed_keys[0]]
+
+def recover_key_schedule(oracle, rounds=4, seed=None, pair_factor=PAIR_FACTOR, beam=3):
+    """
+    Recover the full key schedule of the cipher behind `oracle` (rounds SP rounds + the final round).
+    Returns (keys, stats): keys is None unless exactly one schedule passed the final check;
+    stats holds the encryptions used, the number of schedules checked and every schedule that passed.
+    """
+    rng = np.random.default_rng(seed)
+    solve_cts = oracle(SOLVE_PLAINTEXTS)
+    check_pts = rng.integers(0, 2**16, CHECK_PAIRS, dtype=np.uint16)
+    check_cts = oracle(check_pts)
+    stats = {"schedules_checked": 0}
+
+    def search(level, peeled_keys):
+        if level == 0:
+            passed = []
+            for k0, k1 in solve_first_round(SOLVE_PLAINTEXTS, peel(solve_cts, peeled_keys)):
+                keys = transformed_to_schedule(k0, peeled_keys + [k1])
+                stats["schedules_checked"] += 1
+                if np.array_equal(encrypt_batch(check_pts, keys), check_cts):
+                    passed.append(keys)
+            return passed
+        for candidate in recover_level(oracle, level, peeled_keys, rng, pair_factor, beam):
+            passed = search(level - 1, peeled_keys + [candidate])
+            if passed:
+                return passed
+        return []
+
+    candidates = search(rounds, [])
+    stats["candidates"] = candidates
+    stats["encryptions"] = oracle.encryptions
+    return (candidates[0] if len(candidates) == 1 else None), stats
+
+if __name__ == "__main__":
+    from part1 import generate_keys
+
+    print("=== Full Key Schedule Recovery (multiple differentials) ===")
+    secret_keys = generate_keys()
+    oracle = EncryptionOracle(secret_keys)
+    keys, stats = recover_key_schedule(oracle, seed=1)
+    if keys is None:
+        print(f"No unique key schedule: {len(stats['candidates'])} passed the check.")
+    else:
+        print("Recovered round keys: " + ", ".join(f"0x{k:04X}" for k in keys))
+        print(f"Matches the secret schedule: {keys == secret_keys}")
+    print(f"Chosen-plaintext encryptions: {stats['encryptions']}, schedules checked: {stats['schedules_checked']}")
+    print("Brute force needs up to 2^16 encryptions for the last round key alone (the other five given),"
+          " and up to 2^96 for the whole schedule.")
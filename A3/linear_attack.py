@@ -0,0 +1,231 @@
+"""
+linear_attack.py - Linear Cryptanalysis (Matsui's Algorithm 2)
+----------------------------------------------------------------
+
+1. Linear trail search: the branch-and-bound search of part3, driven by the LAT
+   (weight of an S-box transition = -log2 |LAT[a][b]| / 8, the absolute correlation).
+   Masks go through the P-box exactly like differences.
+2. Bias estimation: the piling-up lemma on the trail found,
+   bias = 2^(m-1) * product of the m S-box biases LAT[a][b] / 16.
+3. Last-round key recovery: for every candidate of the key nibbles under the active nibbles of the
+   output mask, count the known plaintexts satisfying alpha.P ^ gamma.S^-1(C ^ k) = 0; the right key
+   gives the count furthest from N/2. linear_attack scores every nibble of the last round key with
+   several such approximations at once (multiple linear cryptanalysis).
+   The direct count costs O(N * 2^k); the Walsh-Hadamard count first compresses the N texts into a
+   2^k-entry table and turns the key loop into an XOR convolution: O(N + k * 2^k).
+"""
+
+import numpy as np
+
+from part1 import S_BOX, S_INV, generate_keys
+from part3 import build_transition_tables, best_trail_weights, top_trails, split_nibbles, search_best_trails
+from part4 import candidate_subkey
+from sbox_analysis import linear_table, fast_walsh_hadamard, parity
+from fast_cipher import encrypt_batch, P_LAYER
+
+LAT = linear_table(S_BOX)
+
+# Trail search tables: absolute correlations |LAT| / 8 play the role of the DDT probabilities
+LINEAR_TABLES = build_transition_tables(np.abs(LAT) / 8.0)
+
+# The P-box maps an S-layer output mask to the next round's input mask; this undoes it
+INVERSE_P_LAYER = np.argsort(P_LAYER)
+
+# Number of known plaintexts processed together by the direct counter
+DIRECT_CHUNK_SIZE = 1024
+
+def trail_bias(trail):
+    """
+    Bias of the approximation trail[0].P ^ trail[-1].U = 0 (U: state after the trail's rounds)
+    through the piling-up lemma, with the sign of every LAT entry.
+    """
+    biases = []
+    for r in range(len(trail) - 1):
+        in_masks = split_nibbles(trail[r])
+        out_masks = split_nibbles(int(INVERSE_P_LAYER[trail[r + 1]]))
+        for a, b in zip(in_masks, out_masks):
+            if a or b:
+                biases.append(LAT[a][b] / 16.0)
+    return 2.0 ** (len(biases) - 1) * float(np.prod(biases))
+
+def search_linear_trails(rounds=4, top=10, extra_weight=2.0):
+    """
+    Branch-and-bound search for the best linear trails over all 2^16 - 1 input masks.
+    Returns (trails, bounds): trails lists (bias, [mask per round]) best first, bounds the best
+    trail weight for every number of rounds.
+    """
+    bounds = best_trail_weights(rounds, LINEAR_TABLES)
+    trails = top_trails(rounds, bounds, top, extra_weight, LINEAR_TABLES)
+    return [(trail_bias(trail), trail) for _, trail in trails], bounds
+
+def required_texts(bias, constant=8):
+    """Known plaintexts needed by Algorithm 2, about constant / bias^2."""
+    return int(np.ceil(constant / bias**2))
+
+def gather_known_plaintexts(num_texts, keys=None, seed=None):
+    """Encrypt num_texts random plaintexts (the hard-coded part1 keys by default)."""
+    if keys is None:
+        keys = generate_keys()
+    rng = np.random.default_rng(seed)
+    pts = rng.integers(0, 2**16, num_texts, dtype=np.uint16)
+    return pts, encrypt_batch(pts, keys)
+
+def active_nibbles_of(mask):
+    """Indices (0 = most significant) of the nonzero nibbles of a 16-bit mask."""
+    return [i for i, nib in enumerate(split_nibbles(mask)) if nib]
+
+def compress_ciphertexts(cts, active_nibbles):
+    """Keep only the active nibbles of every ciphertext, as base-16 digits (first active nibble first)."""
+    compressed = np.zeros(cts.shape, dtype=np.int64)
+    for nibble_index in active_nibbles:
+        compressed = (compressed << 4) | ((cts.astype(np.int64) >> (4 * (3 - nibble_index))) & 0xF)
+    return compressed
+
+def output_parity_table(gamma, active_nibbles):
+    """For every compressed value y, the parity gamma.S^-1(y) over the active nibbles."""
+    s_inv = np.array(S_INV, dtype=np.int64)
+    masks = split_nibbles(gamma)
+    table = np.zeros(1, dtype=np.int64)
+    for nibble_index in active_nibbles:
+        nibble_parity = parity(s_inv & masks[nibble_index])
+        table = (table[:, None] ^ nibble_parity[None, :]).reshape(-1)
+    return table
+
+def direct_key_counts(pts, cts, alpha, gamma):
+    """
+    Counter per candidate: #{texts with alpha.P ^ gamma.S^-1(C ^ k) = 0}, computed by
+    broadcasting every text against every candidate (O(N * 2^k)).
+    """
+    active = active_nibbles_of(gamma)
+    output_parity = output_parity_table(gamma, active)
+    candidates = np.arange(output_parity.size)
+    compressed = compress_ciphertexts(cts, active)
+    input_parity = parity(pts.astype(np.int64) & alpha)
+    counts = np.zeros(output_parity.size, dtype=np.int64)
+    for start in range(0, pts.size, DIRECT_CHUNK_SIZE):
+        chunk = compressed[start:start + DIRECT_CHUNK_SIZE, None]
+        bits = output_parity[chunk ^ candidates] ^ input_parity[start:start + DIRECT_CHUNK_SIZE, None]
+        counts += (bits == 0).sum(axis=0)
+    return counts
+
+def walsh_key_counts(pts, cts, alpha, gamma):
+    """
+    Same counters as direct_key_counts in O(N + k * 2^k):
+      a[c] = sum of (-1)^(alpha.P) over the texts whose active ciphertext nibbles are c,
+      corr[k] = sum_c a[c] * (-1)^(gamma.S^-1(c ^ k)) is an XOR convolution, so
+      corr = WHT(WHT(a) * WHT(s)) / 2^k, and count[k] = (N + corr[k]) / 2.
+    """
+    active = active_nibbles_of(gamma)
+    output_parity = output_parity_table(gamma, active)
+    size = output_parity.size
+    signs = 1 - 2 * parity(pts.astype(np.int64) & alpha)
+    compressed_signs = np.bincount(compress_ciphertexts(cts, active), weights=signs, minlength=size)
+    spectrum = fast_walsh_hadamard(compressed_signs.astype(np.int64)) * fast_walsh_hadamard(1 - 2 * output_parity)
+    correlations = fast_walsh_hadamard(spectrum) // size
+    return (pts.size + correlations) // 2
+
+def rank_subkeys(counts, num_texts, gamma, top=10):
+    """Rank candidates by |count / N - 1/2|; returns (subkey, estimated bias) best first."""
+    biases = counts / num_texts - 0.5
+    order = np.argsort(-np.abs(biases), kind="stable")[:top]
+    active = active_nibbles_of(gamma)
+    return [(candidate_subkey(int(index), active), float(biases[index])) for index in order]
+
+def single_nibble_approximations(rounds=4, trails=3000, extra_weight=6.0):
+    """
+    Collect the approximations (alpha, gamma) of the best trails whose output mask gamma has a single
+    active nibble, grouped by that nibble: {nibble index: [(|bias|, alpha, gamma), ...] best first}.
+    Several trails can share (alpha, gamma); the best trail bias is kept.
+    """
+    found, _ = search_linear_trails(rounds, trails, extra_weight)
+    best = {}
+    for bias, trail in found:
+        active = active_nibbles_of(trail[-1])
+        if len(active) == 1:
+            key = (trail[0], trail[-1])
+            best[key] = max(best.get(key, 0.0), abs(bias))
+    grouped = {}
+    for (alpha, gamma), bias in best.items():
+        grouped.setdefault(active_nibbles_of(gamma)[0], []).append((bias, alpha, gamma))
+    return {nibble: sorted(approximations, reverse=True) for nibble, approximations in grouped.items()}
+
+def linear_attack(num_texts=None, rounds=4, keys=None, seed=None, approximations_per_nibble=32, top=3):
+    """
+    Recover the last round key nibble by nibble with multiple linear approximations.
+    A single approximation can rank a wrong key first on this 4-bit S-box (the trail bias hides a
+    key-dependent linear hull, and some wrong keys keep a large bias), so every candidate nibble is
+    scored by the sum of its squared estimated biases over the best single-nibble approximations.
+    By default the number of texts is required_texts(best approximation bias).
+    Returns a dict with the recovered key, the known plaintexts used and the ranked candidates per nibble.
+    """
+    approximations = single_nibble_approximations(rounds)
+    if num_texts is None:
+        num_texts = required_texts(max(group[0][0] for group in approximations.values()))
+    pts, cts = gather_known_plaintexts(num_texts, keys, seed)
+
+    recovered_key = 0
+    nibbles = {}
+    for nibble_index in range(4):
+        selected = approximations.get(nibble_index, [])[:approximations_per_nibble]
+        if not selected:
+            continue
+        scores = np.zeros(16)
+        for _, alpha, gamma in selected:
+            scores += (walsh_key_counts(pts, cts, alpha, gamma) / num_texts - 0.5) ** 2
+        order = np.argsort(-scores, kind="stable")[:top]
+        nibbles[nibble_index] = {
+            "approximations": len(selected),
+            "ranked": [(int(candidate), float(scores[candidate])) for candidate in order],
+        }
+        recovered_key |= int(order[0]) << (4 * (3 - nibble_index))
+    return {"key": recovered_key, "texts": num_texts, "nibbles": nibbles}
+
+if __name__ == "__main__":
+    import time
+
+    print("=== Linear Attack (Matsui's Algorithm 2) ===")
+    trails, bounds = search_linear_trails(rounds=4, top=3)
+    print("Best linear trails (4 rounds):")
+    for bias, trail in trails:
+        print(f"  {' -> '.join(f'0x{m:04X}' for m in trail)}  Bias = {bias:+.6f}")
+
+    keys = generate_keys()
+    alpha, gamma = trails[0][1][0], trails[0][1][-1]
+
+    # Single approximation (best trail): on this S-box a wrong key can come out on top
+    pts, cts = gather_known_plaintexts(2**14, keys, seed=1)
+    key_mask = sum(0xF << (4 * (3 - i)) for i in active_nibbles_of(gamma))
+    print(f"\nSingle approximation 0x{alpha:04X} -> 0x{gamma:04X}, {pts.size} known plaintexts "
+          f"(actual key nibbles: 0x{keys[5] & key_mask:04X}):")
+    for subkey, bias in rank_subkeys(walsh_key_counts(pts, cts, alpha, gamma), pts.size, gamma, 4):
+        print(f"  Candidate 0x{subkey:04X}: estimated bias {bias:+.5f}")
+
+    # Direct counting vs Walsh-Hadamard counting on the same data
+    start = time.perf_counter()
+    direct = direct_key_counts(pts, cts, alpha, gamma)
+    direct_time = time.perf_counter() - start
+    start = time.perf_counter()
+    walsh = walsh_key_counts(pts, cts, alpha, gamma)
+    walsh_time = time.perf_counter() - start
+    print(f"Direct counting: {direct_time:.4f}s, Walsh-Hadamard counting: {walsh_time:.4f}s, "
+          f"same counters: {np.array_equal(direct, walsh)}")
+
+    # Multiple approximations, nibble by nibble
+    result = linear_attack(keys=keys, seed=1)
+    print(f"\nMultiple approximations, {result['texts']} known plaintexts:")
+    for nibble_index, info in result["nibbles"].items():
+        ranked = ", ".join(f"0x{candidate:X} ({score:.4f})" for candidate, score in info["ranked"])
+        print(f"  Nibble {nibble_index} ({info['approximations']} approximations): {ranked}")
+    print(f"Recovered last round key: 0x{result['key']:04X} (actual 0x{keys[5]:04X})")
+
+    # Data and time complexity against the differential attack of part4
+    _, differentials, _ = search_best_trails(rounds=4, top=1)
+    probability = differentials[0][0]
+    k = 4 * len(active_nibbles_of(gamma))
+    bias = abs(trails[0][0])
+    print("\nComplexity comparison (4-round distinguishers):")
+    print(f"  Differential: best differential probability {probability:.5f}, "
+          f"about {2 * int(np.ceil(8 / probability))} chosen plaintexts (8 / p pairs)")
+    print(f"  Linear: best trail bias {bias:.5f}, about {required_texts(bias)} known plaintexts (8 / bias^2)")
+    print(f"  Linear key counting for {k} key bits: direct N * 2^k = {required_texts(bias) * 2**k}, "
+          f"Walsh-Hadamard N + k * 2^k = {required_texts(bias) + k * 2**k}")
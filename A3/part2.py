@@ -4,13 +4,11 @@ my_part2.py - S-box Difference Distribution Table (DDT)
 --------------------------------------------------------
 """
 
-# S-box definition (16 elements, each in [0..15])
-SBOX_TABLE = [
-    0x6, 0x4, 0xC, 0x5,
-    0x0, 0x7, 0x2, 0xE,
-    0x1, 0xF, 0x3, 0xD,
-    0x8, 0xA, 0x9, 0xB
-]
+from part1 import S_BOX
+from sbox_analysis import difference_table
+
+# S-box definition (16 elements, each in [0..15]), shared with part1
+SBOX_TABLE = S_BOX
 
 def build_difference_table():
     """
@@ -18,15 +16,7 @@ def build_difference_table():
     difference_table[a][b] = number of x values such that
         SBOX_TABLE[x] XOR SBOX_TABLE[x ^ a] = b.
     """
-    size = 16
-    difference_table = [[0 for _ in range(size)] for _ in range(size)]
-    # For each possible input difference a:
-    for a in range(size):
-        # Test all x in {0..15} to see how the output difference is distributed.
-        for x in range(size):
-            output_diff = SBOX_TABLE[x] ^ SBOX_TABLE[x ^ a]
-            difference_table[a][output_diff] += 1
-    return difference_table
+    return difference_table(SBOX_TABLE).tolist()
 
 def display_ddt(difference_table):
     """
@@ -4,25 +4,18 @@ part3.py - Differential Trail Exploration
 
 """
 
+import heapq
+import math
+
+from part1 import S_BOX
+from sbox_analysis import difference_table
+
 def compute_normalized_ddt():
     """
     Build the normalized Difference Distribution Table (DDT) for the S-box.
     Each count is divided by 16 (the number of possible input values) to get a probability.
     """
-    # S-box definition (same as in Part 1)
-    SBOX = [0x6, 0x4, 0xC, 0x5,
-            0x0, 0x7, 0x2, 0xE,
-            0x1, 0xF, 0x3, 0xD,
-            0x8, 0xA, 0x9, 0xB]
-    table_size = 16
-    ddt = [[0] * table_size for _ in range(table_size)]
-    for delta_in in range(table_size):
-        for x in range(table_size):
-            output_diff = SBOX[x] ^ SBOX[x ^ delta_in]
-            ddt[delta_in][output_diff] += 1
-    # Normalize each entry by dividing by 16
-    normalized_ddt = [[count / 16.0 for count in row] for row in ddt]
-    return normalized_ddt
+    return (difference_table(S_BOX) / 16.0).tolist()
 
 def int_to_bitlist(num, width=16):
     """Convert an integer to a list of bits (MSB first)."""
@@ -115,6 +108,159 @@ def explore_differential_trail(init_diff, rounds=4):
 
     return current_diff, cumulative_probability, trail_details
 
+# Branch-and-bound trail search (Matsui's algorithm)
+# ------------------------------------------------
+# Trails are weighed by w = -log2(probability), so probabilities multiply as weights add.
+# B[r], the weight of the best r-round trail, is computed for r = 1, 2, ... in turn; a partial trail
+# of weight w with r rounds left is abandoned as soon as w + B[r] exceeds the current bound.
+
+# Tolerance for comparing float weights
+WEIGHT_EPSILON = 1e-9
+
+def build_transition_tables(probabilities):
+    """
+    Build the tables driving the trail search from a 16x16 table of nibble transition
+    probabilities (normalized DDT, or absolute LAT correlations for linear trails):
+      - nibble_transitions[a]: the (weight, b) transitions of input nibble a, most probable first
+      - active_transitions: every (weight, a, b) with a != 0, most probable first (the free first round)
+      - min_active_weight: the smallest weight of an active S-box
+    """
+    nibble_transitions = []
+    for delta_in in range(16):
+        row = [(-math.log2(prob), delta_out) for delta_out, prob in enumerate(probabilities[delta_in]) if prob > 0]
+        nibble_transitions.append(sorted(row))
+    active_transitions = sorted((weight, delta_in, delta_out)
+                                for delta_in in range(1, 16) for weight, delta_out in nibble_transitions[delta_in])
+    return nibble_transitions, active_transitions, active_transitions[0][0]
+
+DIFFERENTIAL_TABLES = build_transition_tables(compute_normalized_ddt())
+
+# The P-box is linear: PBOX_NIBBLES[i][v] is the permuted position of nibble value v at index i,
+# and the permutation of a 16-bit value is the XOR of its four nibble contributions.
+PBOX_NIBBLES = [[apply_pbox(v << (4 * (3 - i))) for v in range(16)] for i in range(4)]
+
+def enumerate_trails(rounds, bounds, max_weight, collect, tables=DIFFERENTIAL_TABLES):
+    """
+    Call collect(trail, weight) for every trail of `rounds` rounds whose weight is at most max_weight().
+    A trail is the list of differences [input, after round 1, ..., after round `rounds`].
+    bounds[r] must be a lower bound on the weight of any r-round trail; max_weight is a function so the
+    caller can tighten the bound while the search runs. tables come from build_transition_tables.
+    """
+    nibble_transitions, active_transitions, min_active_weight = tables
+    trail = [0] * (rounds + 1)
+
+    def next_round(r, diff_in, weight):
+        # Rounds r+1 .. rounds are still to be chosen, diff_in is the difference entering round r+1
+        if r == rounds:
+            collect(list(trail), weight)
+            return
+        nibbles = split_nibbles(diff_in)
+        active = [i for i in range(4) if nibbles[i]]
+        rest_bound = bounds[rounds - r - 1]
+
+        def next_nibble(j, diff_out, w):
+            if j == len(active):
+                trail[r + 1] = diff_out
+                next_round(r + 1, diff_out, w)
+                return
+            position = active[j]
+            floor = w + min_active_weight * (len(active) - j - 1) + rest_bound
+            for transition_weight, nib_out in nibble_transitions[nibbles[position]]:
+                # Transitions are sorted, so every later one is pruned as well
+                if floor + transition_weight > max_weight() + WEIGHT_EPSILON:
+                    break
+                next_nibble(j + 1, diff_out ^ PBOX_NIBBLES[position][nib_out], w + transition_weight)
+
+        next_nibble(0, 0, weight)
+
+    # First round: the input difference is free, every nibble is inactive or takes any active transition
+    rest_bound = bounds[rounds - 1]
+
+    def first_round_nibble(position, diff_in, diff_out, w):
+        if position == 4:
+            if diff_in:
+                trail[0], trail[1] = diff_in, diff_out
+                next_round(1, diff_out, w)
+            return
+        first_round_nibble(position + 1, diff_in, diff_out, w)
+        for transition_weight, nib_in, nib_out in active_transitions:
+            if w + transition_weight + rest_bound > max_weight() + WEIGHT_EPSILON:
+                break
+            first_round_nibble(position + 1, diff_in | (nib_in << (4 * (3 - position))),
+                               diff_out ^ PBOX_NIBBLES[position][nib_out], w + transition_weight)
+
+    first_round_nibble(0, 0, 0, 0.0)
+
+def best_trail_weights(rounds, tables=DIFFERENTIAL_TABLES):
+    """
+    Compute B[0..rounds]: B[r] is the weight of the best r-round trail.
+    Each B[r] is found by searching below a bound that starts at B[r-1] + the smallest active S-box
+    weight and grows one bit at a time until a trail appears; the bound then shrinks to the best trail found.
+    """
+    bounds = [0.0]
+    for r in range(1, rounds + 1):
+        bound = bounds[-1] + tables[2]
+        best = [math.inf]
+        while best[0] == math.inf:
+            current = [bound]
+
+            def collect(trail, weight):
+                best[0] = min(best[0], weight)
+                current[0] = best[0]
+
+            enumerate_trails(r, bounds, lambda: current[0], collect, tables)
+            bound += 1.0
+        bounds.append(best[0])
+    return bounds
+
+def top_trails(rounds, bounds, top, extra_weight, tables=DIFFERENTIAL_TABLES):
+    """
+    Return the `top` lightest trails as (weight, trail), lightest first, among those at most
+    extra_weight above bounds[rounds]. A heap keeps the best trails found so far, and once it is full
+    the search only continues below the worst of them.
+    """
+    heap = []
+    limit = [bounds[rounds] + extra_weight]
+
+    def collect_trail(trail, weight):
+        heapq.heappush(heap, (-weight, trail))
+        if len(heap) > top:
+            heapq.heappop(heap)
+        if len(heap) == top:
+            limit[0] = min(limit[0], -heap[0][0])
+
+    enumerate_trails(rounds, bounds, lambda: limit[0], collect_trail, tables)
+    return [(-negative_weight, trail) for negative_weight, trail in sorted(heap, reverse=True)]
+
+def search_best_trails(rounds=4, top=10, extra_weight=2.0):
+    """
+    Branch-and-bound search over all 2^16 - 1 input differences.
+
+    Returns (trails, differentials, bounds):
+      trails: the `top` best trails as (probability, [differences per round]), best first.
+      differentials: the `top` best (probability, input difference, output difference, number of trails),
+                     where the probability sums every trail found between the same input and output
+                     differences; trails up to extra_weight bits worse than the best one are enumerated.
+      bounds: B[0..rounds], the best trail weight for every number of rounds.
+    """
+    bounds = best_trail_weights(rounds)
+    trails = [(2.0 ** -weight, trail) for weight, trail in top_trails(rounds, bounds, top, extra_weight)]
+
+    # Differentials: add up every trail within extra_weight bits of the best one
+    differentials = {}
+    differential_limit = bounds[rounds] + extra_weight
+
+    def collect_differential(trail, weight):
+        key = (trail[0], trail[-1])
+        probability, count = differentials.get(key, (0.0, 0))
+        differentials[key] = (probability + 2.0 ** -weight, count + 1)
+
+    enumerate_trails(rounds, bounds, lambda: differential_limit, collect_differential)
+    ranked = sorted(((probability, delta_in, delta_out, count)
+                     for (delta_in, delta_out), (probability, count) in differentials.items()),
+                    key=lambda item: (-item[0], item[1], item[2]))[:top]
+    return trails, ranked, bounds
+
 if __name__ == "__main__":
     print("Differential Trail Exploration (4 rounds):\n")
     best_trail = None
@@ -135,3 +281,14 @@ if __name__ == "__main__":
         for round_num, (diff_val, round_prob) in enumerate(trail_info, start=1):
             print(f"  Round {round_num}: Diff = 0x{diff_val:04X}, Round Prob = {round_prob:.6f}")
         print(f"Overall Trail Probability: {max_probability:.6f}")
+
+    # Branch-and-bound search over every nonzero input difference
+    trails, differentials, bounds = search_best_trails(rounds=4, top=5)
+    print("\nBranch-and-bound search (4 rounds):")
+    print("  Best trail weight per number of rounds: " + ", ".join(f"{b:.3f}" for b in bounds[1:]))
+    print("  Top trails:")
+    for prob, trail in trails:
+        print(f"    {' -> '.join(f'0x{d:04X}' for d in trail)}  Prob = {prob:.6f}")
+    print("  Top differentials (trails summed):")
+    for prob, delta_in, delta_out, count in differentials:
+        print(f"    0x{delta_in:04X} -> 0x{delta_out:04X}  Prob = {prob:.6f} ({count} trails)")
@@ -6,12 +6,19 @@ part4.py - Differential Attack for Key Recovery and Bruteforce
 """
 
 import random
-from part1 import encrypt, generate_keys, split_into_nibbles, inverse_substitute
+import numpy as np
+from part1 import S_INV, generate_keys, split_into_nibbles
+from fast_cipher import encrypt_batch
 
 # Differential parameters
 DIFF_INPUT = 0x0020   # The input difference (nibbles: 0, 0, 2, 0)
 DIFF_OUTPUT = 0x0020  # Expected output difference for the trail
 
+# Number of pairs processed together by the key-counting engine
+COUNTING_CHUNK_SIZE = 4096
+
+S_INV_ARRAY = np.array(S_INV, dtype=np.uint8)
+
 def gather_attack_data(num_pairs=2**12):
     """
     Collect plaintext-ciphertext pairs for the attack.
@@ -23,16 +30,15 @@ def gather_attack_data(num_pairs=2**12):
       (keys, data_pairs): the 6 round keys and a list of pairs
          [(pt, ct, pt_variant, ct_variant), ...].
     """
-    data_pairs = []
     # Use the hard-coded keys from part1
     keys = generate_keys()
     
-    for _ in range(num_pairs):
-        pt = random.getrandbits(16)
-        pt_variant = pt ^ DIFF_INPUT
-        ct = encrypt(pt, keys)
-        ct_variant = encrypt(pt_variant, keys)
-        data_pairs.append((pt, ct, pt_variant, ct_variant))
+    # Draw the plaintexts first, then encrypt them all in one vectorized pass
+    pts = np.array([random.getrandbits(16) for _ in range(num_pairs)], dtype=np.uint16)
+    pt_variants = pts ^ DIFF_INPUT
+    cts = encrypt_batch(pts, keys)
+    ct_variants = encrypt_batch(pt_variants, keys)
+    data_pairs = list(zip(pts.tolist(), cts.tolist(), pt_variants.tolist(), ct_variants.tolist()))
     return keys, data_pairs
 
 def filter_valid_pairs(pairs):
@@ -50,6 +56,176 @@ def filter_valid_pairs(pairs):
             valid.append((pt, ct, pt_variant, ct_variant))
     return valid
 
+def pairs_to_arrays(pairs):
+    """Turn a list of (pt, ct, pt_variant, ct_variant) tuples into two uint16 arrays of ciphertexts."""
+    cts = np.array([pair[1] for pair in pairs], dtype=np.uint16)
+    ct_variants = np.array([pair[3] for pair in pairs], dtype=np.uint16)
+    return cts, ct_variants
+
+def nibble_matches(cts, ct_variants, nibble_index, expected_nibble):
+    """
+    For every pair and every 4-bit key candidate, check whether undoing the final key XOR
+    and S-box on one nibble gives the expected difference. Returns a (pairs, 16) boolean array.
+    """
+    shift = 4 * (3 - nibble_index)  # nibble index 0 is the most significant, as in split_into_nibbles
+    candidates = np.arange(16, dtype=np.uint8)
+    nibs = ((cts >> shift) & 0xF).astype(np.uint8)[:, None]
+    variant_nibs = ((ct_variants >> shift) & 0xF).astype(np.uint8)[:, None]
+    return (S_INV_ARRAY[nibs ^ candidates] ^ S_INV_ARRAY[variant_nibs ^ candidates]) == expected_nibble
+
+def row_products(matrices, rows):
+    """
+    Row-wise Kronecker product of (pairs, 16) matrices: column c_1 c_2 ... (base 16) of the
+    result is the product of column c_j of every matrix, i.e. whether the pair suggests that combination.
+    """
+    product = np.ones((rows, 1))
+    for matrix in matrices:
+        product = (product[:, :, None] * matrix[:, None, :]).reshape(rows, -1)
+    return product
+
+def candidate_subkey(index, active_nibbles):
+    """Place the base-16 digits of a candidate index at the active nibble positions of a 16-bit subkey."""
+    subkey = 0
+    for position, nibble_index in enumerate(active_nibbles):
+        digit = (index >> (4 * (len(active_nibbles) - 1 - position))) & 0xF
+        subkey |= digit << (4 * (3 - nibble_index))
+    return subkey
+
+def resolve_active_nibbles(expected_diff, active_nibbles=None):
+    """Active nibbles of the partial subkey: by default the nonzero nibbles of expected_diff."""
+    if active_nibbles is None:
+        active_nibbles = [i for i, nib in enumerate(split_into_nibbles(expected_diff)) if nib]
+    active_nibbles = list(active_nibbles)
+    if not 1 <= len(active_nibbles) <= 4:
+        raise ValueError("Between 1 and 4 active nibbles are needed.")
+    return active_nibbles
+
+def filter_right_pairs(cts, ct_variants, active_nibbles):
+    """Keep the pairs whose ciphertext difference is zero on every inactive nibble."""
+    inactive_mask = 0
+    for i in range(4):
+        if i not in active_nibbles:
+            inactive_mask |= 0xF << (4 * (3 - i))
+    right = ((cts ^ ct_variants) & inactive_mask) == 0
+    return cts[right], ct_variants[right]
+
+def new_key_counters(active_nibbles):
+    """Zeroed counters for accumulate_key_counts (one entry per partial subkey)."""
+    half = (len(active_nibbles) + 1) // 2
+    return np.zeros((16**half, 16**(len(active_nibbles) - half)))
+
+def accumulate_key_counts(counts, cts, ct_variants, expected_diff, active_nibbles):
+    """
+    Add the votes of a batch of ciphertext pairs to the counters, in place.
+    The per-nibble tests are independent, so the counters are a matrix product: the active
+    nibbles are split in two halves, each half gives a (pairs, 16^h) 0/1 matrix, and
+    counts += left^T @ right, computed in chunks of pairs.
+    """
+    expected = split_into_nibbles(expected_diff)
+    half = (len(active_nibbles) + 1) // 2
+    for start in range(0, cts.size, COUNTING_CHUNK_SIZE):
+        chunk, chunk_variants = cts[start:start + COUNTING_CHUNK_SIZE], ct_variants[start:start + COUNTING_CHUNK_SIZE]
+        matches = [nibble_matches(chunk, chunk_variants, i, expected[i]) for i in active_nibbles]
+        counts += row_products(matches[:half], chunk.size).T @ row_products(matches[half:], chunk.size)
+
+def rank_key_counts(counts, active_nibbles, top=10):
+    """
+    Returns (ranked, counts): ranked lists the `top` best (subkey, count, signal-to-noise ratio)
+    with the ratio taken against the mean count of all other candidates (0 for a zero count, inf for a
+    nonzero count over zero noise); counts is the flat array of counters indexed by the base-16 digits
+    of the active nibbles.
+    """
+    counts = counts.reshape(-1).astype(np.int64)
+    # Stable sort: equal counts keep the smaller candidate first
+    order = np.argsort(-counts, kind="stable")[:top]
+    noise_total = counts.sum() - counts[order]
+    noise_mean = noise_total / max(counts.size - 1, 1)
+    ranked = []
+    for index, noise in zip(order, noise_mean):
+        if counts[index] == 0:
+            snr = 0.0
+        elif noise > 0:
+            snr = counts[index] / noise
+        else:
+            snr = float("inf")
+        ranked.append((candidate_subkey(int(index), active_nibbles), int(counts[index]), float(snr)))
+    return ranked, counts
+
+def count_last_round_keys(cts, ct_variants, expected_diff, active_nibbles=None, top=10, filter_pairs=True):
+    """
+    Count, for every partial subkey over the active nibbles of the last round key, how many
+    ciphertext pairs decrypt through the last S-layer to the expected difference.
+
+    - expected_diff: 16-bit difference expected before the last S-layer.
+    - active_nibbles: nibble indices (0 = most significant) covered by the partial subkey;
+      by default the nonzero nibbles of expected_diff. 4 nibbles give 2^16 candidates.
+    - filter_pairs: first drop the pairs whose ciphertext difference is nonzero on an inactive nibble.
+
+    Returns (ranked, counts) as rank_key_counts.
+    """
+    cts = np.asarray(cts, dtype=np.uint16)
+    ct_variants = np.asarray(ct_variants, dtype=np.uint16)
+    active_nibbles = resolve_active_nibbles(expected_diff, active_nibbles)
+    if filter_pairs:
+        cts, ct_variants = filter_right_pairs(cts, ct_variants, active_nibbles)
+    counts = new_key_counters(active_nibbles)
+    accumulate_key_counts(counts, cts, ct_variants, expected_diff, active_nibbles)
+    return rank_key_counts(counts, active_nibbles, top)
+
+# Streaming pipeline
+# ------------------
+# Pairs are generated, encrypted, filtered and counted one NumPy batch at a time, so memory depends
+# on the batch size only (not on the number of pairs): generate_pair_batches -> filter_pair_batches
+# -> count_key_stream.
+
+# Number of pairs generated and encrypted together by the streaming pipeline
+DEFAULT_PAIR_BATCH_SIZE = 2**18
+
+def generate_pair_batches(num_pairs, keys, input_diff=DIFF_INPUT, batch_size=DEFAULT_PAIR_BATCH_SIZE, seed=None):
+    """
+    Yield (pts, cts, pt_variants, ct_variants) uint16 arrays of at most batch_size pairs,
+    num_pairs in total, with random plaintexts from a NumPy generator seeded with `seed`.
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, num_pairs, batch_size):
+        pts = rng.integers(0, 2**16, min(batch_size, num_pairs - start), dtype=np.uint16)
+        pt_variants = pts ^ np.uint16(input_diff)
+        yield pts, encrypt_batch(pts, keys), pt_variants, encrypt_batch(pt_variants, keys)
+
+def filter_pair_batches(batches, active_nibbles, stats=None):
+    """
+    Yield the (cts, ct_variants) of every batch that survive the ciphertext-difference filter.
+    If stats is a dict, its "pairs" and "survivors" totals are updated along the way.
+    """
+    for _, cts, _, ct_variants in batches:
+        survivors = filter_right_pairs(cts, ct_variants, active_nibbles)
+        if stats is not None:
+            stats["pairs"] = stats.get("pairs", 0) + cts.size
+            stats["survivors"] = stats.get("survivors", 0) + survivors[0].size
+        yield survivors
+
+def count_key_stream(filtered_batches, expected_diff, active_nibbles, top=10):
+    """Feed the filtered batches into the key counters; returns (ranked, counts) as rank_key_counts."""
+    counts = new_key_counters(active_nibbles)
+    for cts, ct_variants in filtered_batches:
+        accumulate_key_counts(counts, cts, ct_variants, expected_diff, active_nibbles)
+    return rank_key_counts(counts, active_nibbles, top)
+
+def streaming_attack(num_pairs, keys=None, input_diff=DIFF_INPUT, expected_diff=DIFF_OUTPUT, active_nibbles=None,
+                     batch_size=DEFAULT_PAIR_BATCH_SIZE, seed=None, top=10):
+    """
+    Last-round key counting over num_pairs chosen-plaintext pairs in constant memory.
+    Returns (ranked, counts, stats) with stats = {"pairs": ..., "survivors": ...}.
+    """
+    if keys is None:
+        keys = generate_keys()
+    active_nibbles = resolve_active_nibbles(expected_diff, active_nibbles)
+    stats = {"pairs": 0, "survivors": 0}
+    batches = generate_pair_batches(num_pairs, keys, input_diff, batch_size, seed)
+    ranked, counts = count_key_stream(filter_pair_batches(batches, active_nibbles, stats), expected_diff,
+                                      active_nibbles, top)
+    return ranked, counts, stats
+
 def recover_active_nibble(filtered_pairs):
     """
     Recover the 4-bit value of nibble index 2 in the final round key.
@@ -57,39 +233,30 @@ def recover_active_nibble(filtered_pairs):
     the expected nibble difference (which is 2, from DIFF_OUTPUT=0x0020)
     after reversing the final round S-box operation.
     """
-    counts = [0] * 16
-    # The active nibble from DIFF_OUTPUT is the nibble at index 2: 0x2.
-    expected_active = (DIFF_OUTPUT >> 4) & 0xF  # => 0x2
-
-    for _, ct, _, ct_variant in filtered_pairs:
-        ct_nibs = split_into_nibbles(ct)
-        ct_variant_nibs = split_into_nibbles(ct_variant)
-        for candidate in range(16):
-            # Undo final key XOR and S-box on nibble 2
-            v = inverse_substitute(ct_nibs[2] ^ candidate)
-            v_var = inverse_substitute(ct_variant_nibs[2] ^ candidate)
-            if (v ^ v_var) == expected_active:
-                counts[candidate] += 1
+    cts, ct_variants = pairs_to_arrays(filtered_pairs)
+    ranked, counts = count_last_round_keys(cts, ct_variants, DIFF_OUTPUT, active_nibbles=[2], top=1,
+                                           filter_pairs=False)
     
     # The candidate with the highest count is considered correct.
-    recovered_nibble = max(range(16), key=lambda i: counts[i])
-    return recovered_nibble, counts
+    recovered_nibble = (ranked[0][0] >> 4) & 0xF
+    return recovered_nibble, counts.tolist()
 
 def brute_force_remaining_key_bits(fixed_keys, recovered_nibble, known_pt, known_ct):
     """
     Brute-force the remaining 12 bits of the last round key.
     The last round key is 16 bits, with nibble index 2 fixed to 'recovered_nibble'.
-    We iterate over all possible values for nibbles 0,1,3 (2^12 possibilities).
-    """
-    for candidate in range(2**12):
-        nibble0 = (candidate >> 8) & 0xF
-        nibble1 = (candidate >> 4) & 0xF
-        nibble3 = candidate & 0xF
-        # Construct the 16-bit candidate key: (nibble0, nibble1, recovered_nibble, nibble3)
-        candidate_key = (nibble0 << 12) | (nibble1 << 8) | (recovered_nibble << 4) | nibble3
-        test_keys = fixed_keys + [candidate_key]
-        if encrypt(known_pt, test_keys) == known_ct:
-            return candidate_key
+    We try all possible values for nibbles 0,1,3 (2^12 possibilities) in one vectorized encryption.
+    """
+    candidate = np.arange(2**12, dtype=np.uint16)
+    nibble0 = (candidate >> 8) & 0xF
+    nibble1 = (candidate >> 4) & 0xF
+    nibble3 = candidate & 0xF
+    # Construct the 16-bit candidate keys: (nibble0, nibble1, recovered_nibble, nibble3)
+    candidate_keys = (nibble0 << 12) | (nibble1 << 8) | (recovered_nibble << 4) | nibble3
+    matches = np.flatnonzero(encrypt_batch(known_pt, list(fixed_keys) + [candidate_keys]) == known_ct)
+    if matches.size:
+        # Same answer as trying the candidates in order: the first one that works
+        return int(candidate_keys[matches[0]])
     return None
 
 if __name__ == "__main__":
@@ -125,3 +292,9 @@ if __name__ == "__main__":
             print("\nBrute force did not yield a valid key.")
     else:
         print("No valid pairs available for key recovery.")
+
+    # Step 5: Streaming pipeline (constant memory, any number of pairs)
+    ranked, _, stats = streaming_attack(2**20, keys, seed=42, top=3)
+    print(f"\nStreaming key counting over {stats['pairs']} pairs ({stats['survivors']} survived the filter):")
+    for subkey, count, snr in ranked:
+        print(f"  Subkey 0x{subkey:04X}: count {count}, S/N {snr:.2f}")
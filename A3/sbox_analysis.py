@@ -0,0 +1,134 @@
+"""
+sbox_analysis.py - S-box Analysis Tables and Metrics
+------------------------------------------------------
+
+Works for any n-bit S-box given as a list of 2^n output values (the 4-bit S-box of part1,
+the 8-bit AES s_box, ...). Every table is built with NumPy in a few vectorized passes:
+  - DDT[a][b] = #{x : S(x) ^ S(x ^ a) = b}
+  - LAT[a][b] = #{x : a.x = b.S(x)} - 2^(n-1), from a fast Walsh-Hadamard transform
+  - BCT[a][b] = #{x : S^-1(S(x) ^ b) ^ S^-1(S(x ^ a) ^ b) = a}
+Tables are memoized by the S-box contents and returned read-only.
+"""
+
+import functools
+
+import numpy as np
+
+def sbox_bits(sbox):
+    """Return n for an S-box of 2^n entries (raises ValueError for any other size)."""
+    size = len(sbox)
+    if size < 2 or size & (size - 1):
+        raise ValueError("The S-box must have 2^n entries.")
+    return size.bit_length() - 1
+
+def memoized_by_sbox(function):
+    """Cache a table function by the S-box contents; the table is computed from an int64 array."""
+    cache = {}
+
+    @functools.wraps(function)
+    def wrapper(sbox):
+        key = tuple(int(value) for value in sbox)
+        if key not in cache:
+            sbox_bits(key)
+            table = function(np.array(key, dtype=np.int64))
+            table.setflags(write=False)
+            cache[key] = table
+        return cache[key]
+
+    wrapper.cache = cache
+    return wrapper
+
+def parity(values):
+    """Parity of the bits of every entry of a non-negative integer array (up to 16 bits)."""
+    values = values ^ (values >> 8)
+    values = values ^ (values >> 4)
+    values = values ^ (values >> 2)
+    values = values ^ (values >> 1)
+    return values & 1
+
+def fast_walsh_hadamard(values):
+    """Walsh-Hadamard transform along axis 0 (length 2^n), in n butterfly passes."""
+    result = np.array(values, dtype=np.int64)
+    size = result.shape[0]
+    step = 1
+    while step < size:
+        blocks = result.reshape(size // (2 * step), 2, step, *result.shape[1:])
+        low, high = blocks[:, 0].copy(), blocks[:, 1].copy()
+        blocks[:, 0] = low + high
+        blocks[:, 1] = low - high
+        step *= 2
+    return result
+
+@memoized_by_sbox
+def difference_table(sbox):
+    """Difference Distribution Table: row a is the distribution of output differences for input difference a."""
+    size = sbox.size
+    x = np.arange(size)
+    output_diffs = sbox[x[None, :] ^ x[:, None]] ^ sbox[None, :]
+    return np.bincount((x[:, None] * size + output_diffs).ravel(), minlength=size * size).reshape(size, size)
+
+@memoized_by_sbox
+def linear_table(sbox):
+    """
+    Linear Approximation Table: LAT[a][b] = #{x : a.x = b.S(x)} - 2^(n-1).
+    Column b of the Walsh transform of (-1)^(b.S(x)) is twice column b of the LAT.
+    """
+    size = sbox.size
+    signs = 1 - 2 * parity(sbox[:, None] & np.arange(size)[None, :])
+    return fast_walsh_hadamard(signs) // 2
+
+@memoized_by_sbox
+def boomerang_table(sbox):
+    """Boomerang Connectivity Table (the S-box must be a permutation)."""
+    size = sbox.size
+    if np.unique(sbox).size != size:
+        raise ValueError("The boomerang table needs an invertible S-box.")
+    inverse = np.empty_like(sbox)
+    inverse[sbox] = np.arange(size)
+    x = np.arange(size)
+    outputs = sbox[x]
+    shifted_outputs = sbox[x[None, :] ^ x[:, None]]  # row a: S(x ^ a)
+    table = np.empty((size, size), dtype=np.int64)
+    for b in range(size):
+        returned = inverse[outputs[None, :] ^ b] ^ inverse[shifted_outputs ^ b]
+        table[:, b] = (returned == x[:, None]).sum(axis=1)
+    return table
+
+def differential_uniformity(sbox):
+    """Largest DDT entry over nonzero input differences."""
+    return int(difference_table(sbox)[1:].max())
+
+def nonlinearity(sbox):
+    """2^(n-1) minus the largest |LAT| entry over nonzero output masks."""
+    return (len(sbox) // 2) - int(np.abs(linear_table(sbox)[:, 1:]).max())
+
+def linearity(sbox):
+    """Largest |LAT| entry over nonzero output masks (the best linear approximation bias times 2^n)."""
+    return int(np.abs(linear_table(sbox)[:, 1:]).max())
+
+def boomerang_uniformity(sbox):
+    """Largest BCT entry over nonzero input and output differences."""
+    return int(boomerang_table(sbox)[1:, 1:].max())
+
+def analyse_sbox(sbox):
+    """Summary of the S-box metrics."""
+    size = len(sbox)
+    return {
+        "bits": sbox_bits(sbox),
+        "bijective": len(set(sbox)) == size,
+        "differential_uniformity": differential_uniformity(sbox),
+        "max_differential_probability": differential_uniformity(sbox) / size,
+        "nonlinearity": nonlinearity(sbox),
+        "max_linear_bias": linearity(sbox) / size,
+        "boomerang_uniformity": boomerang_uniformity(sbox) if len(set(sbox)) == size else None,
+    }
+
+if __name__ == "__main__":
+    from part1 import S_BOX
+
+    print("4-bit S-box of the toy cipher:")
+    for name, value in analyse_sbox(S_BOX).items():
+        print(f"  {name}: {value}")
+    print("\nLinear Approximation Table:")
+    for a, row in enumerate(linear_table(S_BOX)):
+        print(f"  {a:2X} | " + " ".join(f"{v:3d}" for v in row))